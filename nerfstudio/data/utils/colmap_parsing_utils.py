@@ -474,6 +474,19 @@ def qvec2rotmat(qvec):
     )
 
 
+def qvecs2rotmats(qvecs):
+    """Batched version of qvec2rotmat, converts (N, 4) quaternions into (N, 3, 3) rotation matrices."""
+    w, x, y, z = qvecs[:, 0], qvecs[:, 1], qvecs[:, 2], qvecs[:, 3]
+    return np.stack(
+        [
+            np.stack([1 - 2 * y**2 - 2 * z**2, 2 * x * y - 2 * w * z, 2 * z * x + 2 * w * y], -1),
+            np.stack([2 * x * y + 2 * w * z, 1 - 2 * x**2 - 2 * z**2, 2 * y * z - 2 * w * x], -1),
+            np.stack([2 * z * x - 2 * w * y, 2 * y * z + 2 * w * x, 1 - 2 * x**2 - 2 * y**2], -1),
+        ],
+        -2,
+    )
+
+
 def rotmat2qvec(R):
     Rxx, Ryx, Rzx, Rxy, Ryy, Rzy, Rxz, Ryz, Rzz = R.flat
     K = (
@@ -18,9 +18,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Literal, Optional, Tuple
 
-from nerfstudio.process_data import colmap_utils, hloc_utils, process_data_utils
 from nerfstudio.process_data.base_converter_to_nerfstudio_dataset import BaseConverterToNerfstudioDataset
-from nerfstudio.process_data.process_data_utils import CAMERA_MODELS
 from nerfstudio.utils import install_checks
 from nerfstudio.utils.rich_utils import CONSOLE
 
@@ -35,6 +33,10 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
     """Feature matching method to use. Vocab tree is recommended for a balance of speed
     and accuracy. Exhaustive is slower but more accurate. Sequential is faster but
     should only be used for videos."""
+    vocab_tree_path: Optional[Path] = None
+    """Path to a COLMAP vocab tree. Used by the vocab_tree matcher (downloaded if not set) and, if set, enables loop
+    detection for the sequential matcher and the vocab tree matcher for exhaustive matching of more than 500 images.
+    Only works with colmap sfm_tool"""
     sfm_tool: Literal["any", "colmap", "hloc"] = "any"
     """Structure from motion tool to use. Colmap will use sift features, hloc can use
     many modern methods such as superpoint features and superglue matcher"""
@@ -44,6 +46,12 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
     refine_intrinsics: bool = True
     """If True, do bundle adjustment to refine intrinsics.
     Only works with colmap sfm_tool"""
+    use_hierarchical_mapper: Optional[bool] = None
+    """If True, use COLMAP's hierarchical mapper, which is much faster on large image sets. If not set, it is used
+    for 500 images or more. Only works with colmap sfm_tool"""
+    fast_mapper: bool = False
+    """If True, run fewer and shorter global bundle adjustments during COLMAP mapping, roughly halving mapping time
+    on large image sets. Only works with colmap sfm_tool"""
     feature_type: Literal[
         "any",
         "sift",
@@ -82,7 +90,8 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
        to the output directory.
     """
     colmap_cmd: str = "colmap"
-    """How to call the COLMAP executable."""
+    """How to call the COLMAP executable. It is looked up on the PATH and run without a shell, so set environment
+    variables (e.g. QT_QPA_PLATFORM=offscreen) when calling ns-process-data instead."""
     images_per_equirect: Literal[8, 14] = 8
     """Number of samples per image to take from each equirectangular image.
        Used only when camera-type is equirectangular.
@@ -130,6 +139,8 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
             image_id_to_depth_path: When including sfm-based depth, embed these depth file paths in the exported json
             image_rename_map: Use these image names instead of the names embedded in the COLMAP db
         """
+        from nerfstudio.process_data import colmap_utils
+
         summary_log = []
         if (self.absolute_colmap_model_path / "cameras.bin").exists():
             with CONSOLE.status("[bold yellow]Saving results to transforms.json", spinner="balloon"):
@@ -155,6 +166,8 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
         Returns:
             Depth file paths indexed by COLMAP image id, logs
         """
+        from nerfstudio.process_data import colmap_utils, process_data_utils
+
         summary_log = []
         if self.use_sfm_depth:
             depth_dir = self.output_dir / "depth"
@@ -185,6 +198,9 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
         Args:
             mask_path: Path to the camera mask. Defaults to None.
         """
+        from nerfstudio.process_data import colmap_utils, hloc_utils, process_data_utils
+        from nerfstudio.process_data.process_data_utils import CAMERA_MODELS
+
         self.absolute_colmap_path.mkdir(parents=True, exist_ok=True)
 
         (
@@ -219,6 +235,9 @@ class ColmapConverterToNerfstudioDataset(BaseConverterToNerfstudioDataset):
                 matching_method=self.matching_method,
                 refine_intrinsics=self.refine_intrinsics,
                 colmap_cmd=self.colmap_cmd,
+                vocab_tree_path=self.vocab_tree_path,
+                use_hierarchical_mapper=self.use_hierarchical_mapper,
+                fast_mapper=self.fast_mapper,
             )
         elif sfm_tool == "hloc":
             if mask_path is not None:
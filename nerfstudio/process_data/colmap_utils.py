@@ -17,6 +17,9 @@ Tools supporting the execution of COLMAP and preparation of COLMAP-based dataset
 """
 
 import json
+import os
+import shutil
+import tempfile
 from pathlib import Path
 from typing import Any, Dict, Literal, Optional, Union
 
@@ -28,40 +31,124 @@ import torch
 from packaging.version import Version
 from rich.progress import track
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, it is only used to write transforms.json faster
+    orjson = None
+
 # TODO(1480) use pycolmap instead of colmap_parsing_utils
 # import pycolmap
 from nerfstudio.data.utils.colmap_parsing_utils import (
     qvec2rotmat,
+    qvecs2rotmats,
     read_cameras_binary,
     read_images_binary,
     read_points3D_binary,
     read_points3D_text,
 )
-from nerfstudio.process_data.process_data_utils import CameraModel
+from nerfstudio.process_data.process_data_utils import CameraModel, list_images
 from nerfstudio.utils import colormaps
+from nerfstudio.utils.install_checks import get_colmap_argv, get_colmap_version
 from nerfstudio.utils.rich_utils import CONSOLE, status
 from nerfstudio.utils.scripts import run_command
 
-
-def get_colmap_version(colmap_cmd: str, default_version: str = "3.8") -> Version:
-    """Returns the version of COLMAP.
-    This code assumes that colmap returns a version string of the form
-    "COLMAP 3.8 ..." which may not be true for all versions of COLMAP.
-
-    Args:
-        default_version: Default version to return if COLMAP version can't be determined.
-    Returns:
-        The version of COLMAP.
-    """
-    output = run_command(f"{colmap_cmd} -h", verbose=False)
-    assert output is not None
-    for line in output.split("\n"):
-        if line.startswith("COLMAP"):
-            version = line.split(" ")[1]
-            version = Version(version)
-            return version
-    CONSOLE.print(f"[bold red]Could not find COLMAP version. Using default {default_version}")
-    return Version(default_version)
+"""Image count from which run_colmap switches to COLMAP's hierarchical mapper."""
+HIERARCHICAL_MAPPER_MIN_IMAGES = 500
+"""Image count above which run_colmap replaces exhaustive matching with the vocab tree matcher, given a vocab tree."""
+VOCAB_TREE_MATCHER_MIN_IMAGES = 500
+"""Mapper options trading a few global bundle adjustments for speed, following COLMAP's "fast" preset."""
+FAST_MAPPER_OPTIONS = {
+    "Mapper.ba_global_images_ratio": 1.4,
+    "Mapper.ba_global_points_ratio": 1.4,
+    "Mapper.ba_global_points_freq": 500000,
+    "Mapper.ba_global_max_num_iterations": 30,
+    "Mapper.ba_global_max_refinements": 2,
+    "Mapper.ba_local_max_num_iterations": 40,
+}
+"""Per camera model, the camera parameters stored in the intrinsics array of poses.npz, in order."""
+POSES_NPZ_INTRINSICS_KEYS = {
+    CameraModel.OPENCV.value: ("fl_x", "fl_y", "cx", "cy", "k1", "k2", "p1", "p2"),
+    CameraModel.OPENCV_FISHEYE.value: ("fl_x", "fl_y", "cx", "cy", "k1", "k2", "k3", "k4"),
+}
+"""Per COLMAP camera model: the matching nerfstudio camera model, and the transforms.json keys with the index of the
+COLMAP parameter each is read from (-1 for zero). Parameters match
+https://github.com/colmap/colmap/blob/dev/src/base/camera_models.h"""
+COLMAP_CAMERA_PARAM_KEYS = {
+    # f, cx, cy
+    # du = dv = 0
+    "SIMPLE_PINHOLE": (
+        CameraModel.OPENCV,
+        (("fl_x", 0), ("fl_y", 0), ("cx", 1), ("cy", 2), ("k1", -1), ("k2", -1), ("p1", -1), ("p2", -1)),
+    ),
+    # fx, fy, cx, cy
+    # du = dv = 0
+    "PINHOLE": (
+        CameraModel.OPENCV,
+        (("fl_x", 0), ("fl_y", 1), ("cx", 2), ("cy", 3), ("k1", -1), ("k2", -1), ("p1", -1), ("p2", -1)),
+    ),
+    # f, cx, cy, k
+    # r2 = u**2 + v**2
+    # radial = k * r2
+    # du = u * radial, dv = v * radial
+    "SIMPLE_RADIAL": (
+        CameraModel.OPENCV,
+        (("fl_x", 0), ("fl_y", 0), ("cx", 1), ("cy", 2), ("k1", 3), ("k2", -1), ("p1", -1), ("p2", -1)),
+    ),
+    # f, cx, cy, k1, k2
+    # r2 = u**2 + v**2
+    # radial = k1 * r2 + k2 * r2**2
+    # du = u * radial, dv = v * radial
+    "RADIAL": (
+        CameraModel.OPENCV,
+        (("fl_x", 0), ("fl_y", 0), ("cx", 1), ("cy", 2), ("k1", 3), ("k2", 4), ("p1", -1), ("p2", -1)),
+    ),
+    # fx, fy, cx, cy, k1, k2, p1, p2
+    # r2 = u**2 + v**2
+    # radial = k1 * r2 + k2 * r2**2
+    # du = u * radial + 2 * p1 * u * v + p2 * (r2 + 2 * u**2)
+    # dv = v * radial + 2 * p2 * u * v + p1 * (r2 + 2 * v**2)
+    "OPENCV": (
+        CameraModel.OPENCV,
+        (("fl_x", 0), ("fl_y", 1), ("cx", 2), ("cy", 3), ("k1", 4), ("k2", 5), ("p1", 6), ("p2", 7)),
+    ),
+    # fx, fy, cx, cy, k1, k2, k3, k4
+    # r = sqrt(u**2 + v**2), theta = atan(r)
+    # thetad = theta * (1 + k1 * theta**2 + k2 * theta**4 + k3 * theta**6 + k4 * theta**8)
+    # du = u * thetad / r - u, dv = v * thetad / r - v (du = dv = 0 if r <= eps)
+    "OPENCV_FISHEYE": (
+        CameraModel.OPENCV_FISHEYE,
+        (("fl_x", 0), ("fl_y", 1), ("cx", 2), ("cy", 3), ("k1", 4), ("k2", 5), ("k3", 6), ("k4", 7)),
+    ),
+    # f, cx, cy, k
+    # r = sqrt(u**2 + v**2), theta = atan(r)
+    # thetad = theta * (1 + k * theta**2)
+    # du = u * thetad / r - u, dv = v * thetad / r - v (du = dv = 0 if r <= eps)
+    "SIMPLE_RADIAL_FISHEYE": (
+        CameraModel.OPENCV_FISHEYE,
+        (("fl_x", 0), ("fl_y", 0), ("cx", 1), ("cy", 2), ("k1", 3), ("k2", -1), ("k3", -1), ("k4", -1)),
+    ),
+    # f, cx, cy, k1, k2
+    # r = sqrt(u**2 + v**2), theta = atan(r)
+    # thetad = theta * (1 + k1 * theta**2 + k2 * theta**4)
+    # du = u * thetad / r - u, dv = v * thetad / r - v (du = dv = 0 if r <= eps)
+    "RADIAL_FISHEYE": (
+        CameraModel.OPENCV_FISHEYE,
+        (("fl_x", 0), ("fl_y", 0), ("cx", 1), ("cy", 2), ("k1", 3), ("k2", 4), ("k3", -1), ("k4", -1)),
+    ),
+    # Not supported yet:
+    # FULL_OPENCV: fx, fy, cx, cy, k1, k2, p1, p2, k3, k4, k5, k6
+    #   r2 = u**2 + v**2, r4 = r2 * r2, r6 = r4 * r2
+    #   radial = (1 + k1 * r2 + k2 * r4 + k3 * r6) / (1 + k4 * r2 + k5 * r4 + k6 * r6)
+    #   du = u * radial + 2 * p1 * u * v + p2 * (r2 + 2 * u**2) - u
+    #   dv = v * radial + 2 * p2 * u * v + p1 * (r2 + 2 * v**2) - v
+    # FOV: fx, fy, cx, cy, omega
+    # THIN_PRISM_FISHEYE
+}
+"""Shared memory filesystem run_colmap keeps the COLMAP database on while COLMAP runs, when it has room."""
+SHARED_MEMORY_DIR = Path("/dev/shm")
+"""Rough upper bound of database bytes per SIFT feature: descriptor, keypoint and a share of the matches."""
+COLMAP_DATABASE_BYTES_PER_FEATURE = 512
 
 
 def get_vocab_tree() -> Path:
@@ -99,6 +186,12 @@ def run_colmap(
     matching_method: Literal["vocab_tree", "exhaustive", "sequential"] = "vocab_tree",
     refine_intrinsics: bool = True,
     colmap_cmd: str = "colmap",
+    vocab_tree_path: Optional[Path] = None,
+    use_hierarchical_mapper: Optional[bool] = None,
+    fast_mapper: bool = False,
+    sift_max_num_features: int = 8192,
+    sift_estimate_affine_shape: bool = False,
+    sift_domain_size_pooling: bool = False,
 ) -> None:
     """Runs COLMAP on the images.
 
@@ -111,76 +204,139 @@ def run_colmap(
         verbose: If True, logs the output of the command.
         matching_method: Matching method to use.
         refine_intrinsics: If True, refine intrinsics.
-        colmap_cmd: Path to the COLMAP executable.
+        colmap_cmd: How to call the COLMAP executable. It is looked up on the PATH and run without a shell.
+        vocab_tree_path: Path to a COLMAP vocab tree. Used by the vocab_tree matcher (downloaded if not set) and,
+            when set, for loop detection with the sequential matcher. When set, exhaustive matching of more than
+            VOCAB_TREE_MATCHER_MIN_IMAGES images uses the vocab tree matcher instead.
+        use_hierarchical_mapper: If True, use COLMAP's hierarchical mapper. If None, it is used for image sets of at
+            least HIERARCHICAL_MAPPER_MIN_IMAGES images.
+        fast_mapper: If True, run fewer and shorter global bundle adjustments during mapping (COLMAP >= 3.7).
+        sift_max_num_features: Maximum number of SIFT features extracted per image.
+        sift_estimate_affine_shape: If True, estimate affine shapes of the SIFT features (CPU extraction only).
+        sift_domain_size_pooling: If True, use domain size pooling for the SIFT descriptors (CPU extraction only).
     """
 
     colmap_version = get_colmap_version(colmap_cmd)
+    colmap_argv = get_colmap_argv(colmap_cmd)
 
+    num_images = len(list_images(image_dir))
     colmap_database_path = colmap_dir / "database.db"
     colmap_database_path.unlink(missing_ok=True)
-
-    # Feature extraction
-    feature_extractor_cmd = [
-        f"{colmap_cmd} feature_extractor",
-        f"--database_path {colmap_dir / 'database.db'}",
-        f"--image_path {image_dir}",
-        "--ImageReader.single_camera 1",
-        f"--ImageReader.camera_model {camera_model.value}",
-        f"--SiftExtraction.use_gpu {int(gpu)}",
-    ]
-    if camera_mask_path is not None:
-        feature_extractor_cmd.append(f"--ImageReader.camera_mask_path {camera_mask_path}")
-    feature_extractor_cmd = " ".join(feature_extractor_cmd)
-    with status(msg="[bold yellow]Running COLMAP feature extractor...", spinner="moon", verbose=verbose):
-        run_command(feature_extractor_cmd, verbose=verbose)
-
-    CONSOLE.log("[bold green]:tada: Done extracting COLMAP features.")
-
-    # Feature matching
-    feature_matcher_cmd = [
-        f"{colmap_cmd} {matching_method}_matcher",
-        f"--database_path {colmap_dir / 'database.db'}",
-        f"--SiftMatching.use_gpu {int(gpu)}",
-    ]
-    if matching_method == "vocab_tree":
-        vocab_tree_filename = get_vocab_tree()
-        feature_matcher_cmd.append(f'--VocabTreeMatching.vocab_tree_path "{vocab_tree_filename}"')
-    feature_matcher_cmd = " ".join(feature_matcher_cmd)
-    with status(msg="[bold yellow]Running COLMAP feature matcher...", spinner="runner", verbose=verbose):
-        run_command(feature_matcher_cmd, verbose=verbose)
-    CONSOLE.log("[bold green]:tada: Done matching COLMAP features.")
-
-    # Bundle adjustment
-    sparse_dir = colmap_dir / "sparse"
-    sparse_dir.mkdir(parents=True, exist_ok=True)
-    mapper_cmd = [
-        f"{colmap_cmd} mapper",
-        f"--database_path {colmap_dir / 'database.db'}",
-        f"--image_path {image_dir}",
-        f"--output_path {sparse_dir}",
-    ]
-    if colmap_version >= Version("3.7"):
-        mapper_cmd.append("--Mapper.ba_global_function_tolerance=1e-6")
-
-    mapper_cmd = " ".join(mapper_cmd)
-
-    with status(
-        msg="[bold yellow]Running COLMAP bundle adjustment... (This may take a while)",
-        spinner="circle",
-        verbose=verbose,
-    ):
-        run_command(mapper_cmd, verbose=verbose)
-    CONSOLE.log("[bold green]:tada: Done COLMAP bundle adjustment.")
+    # COLMAP commits to the database after every batch of images; keep it in shared memory while the
+    # features are extracted, matched and mapped, then move it to the output directory.
+    database_path = colmap_database_path
+    database_size = num_images * sift_max_num_features * COLMAP_DATABASE_BYTES_PER_FEATURE
+    if SHARED_MEMORY_DIR.is_dir() and hasattr(os, "statvfs"):
+        try:
+            shm_stats = os.statvfs(SHARED_MEMORY_DIR)
+            if shm_stats.f_bavail * shm_stats.f_frsize > database_size:
+                # A directory unique to this run, also holding SQLite's journal; /dev/shm may be shared with other
+                # PID namespaces (e.g. docker --ipc=host), so the PID alone does not identify the run.
+                database_path = Path(tempfile.mkdtemp(prefix="colmap_", dir=SHARED_MEMORY_DIR)) / "database.db"
+        except OSError:
+            # e.g. read-only or inaccessible /dev/shm; keep the database in the COLMAP directory
+            database_path = colmap_database_path
+
+    try:
+        # Feature extraction
+        feature_extractor_cmd = [
+            *colmap_argv,
+            "feature_extractor",
+            *["--database_path", str(database_path)],
+            *["--image_path", str(image_dir)],
+            *["--ImageReader.single_camera", "1"],
+            *["--ImageReader.camera_model", camera_model.value],
+            *["--SiftExtraction.use_gpu", str(int(gpu))],
+            *["--SiftExtraction.max_num_features", str(sift_max_num_features)],
+            *["--SiftExtraction.estimate_affine_shape", str(int(sift_estimate_affine_shape))],
+            *["--SiftExtraction.domain_size_pooling", str(int(sift_domain_size_pooling))],
+            # Descriptors are L1-root (RootSIFT) normalized by COLMAP already; use every core for CPU extraction
+            *["--SiftExtraction.num_threads", "-1"],
+        ]
+        if camera_mask_path is not None:
+            feature_extractor_cmd += ["--ImageReader.camera_mask_path", str(camera_mask_path)]
+        with status(msg="[bold yellow]Running COLMAP feature extractor...", spinner="moon", verbose=verbose):
+            run_command(feature_extractor_cmd, verbose=verbose)
+
+        CONSOLE.log("[bold green]:tada: Done extracting COLMAP features.")
+
+        # Feature matching
+        # Exhaustive matching grows quadratically with the number of images, while the vocab tree matcher only
+        # matches each image against its most similar images.
+        if (
+            matching_method == "exhaustive"
+            and vocab_tree_path is not None
+            and num_images > VOCAB_TREE_MATCHER_MIN_IMAGES
+        ):
+            matching_method = "vocab_tree"
+            CONSOLE.log(f"Using COLMAP's vocab tree matcher instead of exhaustive matching for {num_images} images.")
+        feature_matcher_cmd = [
+            *colmap_argv,
+            f"{matching_method}_matcher",
+            *["--database_path", str(database_path)],
+            *["--SiftMatching.use_gpu", str(int(gpu))],
+        ]
+        if matching_method == "vocab_tree":
+            vocab_tree_filename = vocab_tree_path if vocab_tree_path is not None else get_vocab_tree()
+            feature_matcher_cmd += ["--VocabTreeMatching.vocab_tree_path", str(vocab_tree_filename)]
+        elif matching_method == "sequential" and vocab_tree_path is not None:
+            # Close loops between non-adjacent frames, e.g. when a video returns to its starting point
+            feature_matcher_cmd += ["--SequentialMatching.loop_detection", "1"]
+            feature_matcher_cmd += ["--SequentialMatching.vocab_tree_path", str(vocab_tree_path)]
+        with status(msg="[bold yellow]Running COLMAP feature matcher...", spinner="runner", verbose=verbose):
+            run_command(feature_matcher_cmd, verbose=verbose)
+        CONSOLE.log("[bold green]:tada: Done matching COLMAP features.")
+
+        # Bundle adjustment
+        sparse_dir = colmap_dir / "sparse"
+        sparse_dir.mkdir(parents=True, exist_ok=True)
+        # The hierarchical mapper reconstructs clusters of images in parallel and merges them, which scales much better
+        # than the incremental mapper's global bundle adjustments on large image sets.
+        if use_hierarchical_mapper is None:
+            use_hierarchical_mapper = num_images >= HIERARCHICAL_MAPPER_MIN_IMAGES
+            if use_hierarchical_mapper:
+                CONSOLE.log(f"Using COLMAP's hierarchical mapper for {num_images} images.")
+        mapper_cmd = [
+            *colmap_argv,
+            "hierarchical_mapper" if use_hierarchical_mapper else "mapper",
+            *["--database_path", str(database_path)],
+            *["--image_path", str(image_dir)],
+            *["--output_path", str(sparse_dir)],
+        ]
+        if use_hierarchical_mapper:
+            mapper_cmd += ["--num_workers", str(os.cpu_count() or 1)]
+        if colmap_version >= Version("3.7"):
+            mapper_cmd.append("--Mapper.ba_global_function_tolerance=1e-6")
+        if fast_mapper and colmap_version >= Version("3.7"):
+            for option, value in FAST_MAPPER_OPTIONS.items():
+                mapper_cmd += [f"--{option}", str(value)]
+
+        with status(
+            msg="[bold yellow]Running COLMAP bundle adjustment... (This may take a while)",
+            spinner="circle",
+            verbose=verbose,
+        ):
+            run_command(mapper_cmd, verbose=verbose)
+        CONSOLE.log("[bold green]:tada: Done COLMAP bundle adjustment.")
+    finally:
+        if database_path != colmap_database_path:
+            try:
+                if database_path.exists():
+                    shutil.move(str(database_path), colmap_database_path)
+            finally:
+                # Never leave the database behind in memory, e.g. if the output directory is full
+                shutil.rmtree(database_path.parent, ignore_errors=True)
 
     if refine_intrinsics:
         with status(msg="[bold yellow]Refine intrinsics...", spinner="dqpb", verbose=verbose):
             bundle_adjuster_cmd = [
-                f"{colmap_cmd} bundle_adjuster",
-                f"--input_path {sparse_dir}/0",
-                f"--output_path {sparse_dir}/0",
-                "--BundleAdjustment.refine_principal_point 1",
+                *colmap_argv,
+                "bundle_adjuster",
+                *["--input_path", str(sparse_dir / "0")],
+                *["--output_path", str(sparse_dir / "0")],
+                *["--BundleAdjustment.refine_principal_point", "1"],
             ]
-            run_command(" ".join(bundle_adjuster_cmd), verbose=verbose)
+            run_command(bundle_adjuster_cmd, verbose=verbose)
         CONSOLE.log("[bold green]:tada: Done refining intrinsics.")
 
 
@@ -199,194 +355,26 @@ def parse_colmap_camera_params(camera) -> Dict[str, Any]:
         "h": camera.height,
     }
 
-    # Parameters match https://github.com/colmap/colmap/blob/dev/src/base/camera_models.h
-    camera_params = camera.params
-    if camera.model == "SIMPLE_PINHOLE":
-        # du = 0
-        # dv = 0
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[0])
-        out["cx"] = float(camera_params[1])
-        out["cy"] = float(camera_params[2])
-        out["k1"] = 0.0
-        out["k2"] = 0.0
-        out["p1"] = 0.0
-        out["p2"] = 0.0
-        camera_model = CameraModel.OPENCV
-    elif camera.model == "PINHOLE":
-        # f, cx, cy, k
-
-        # du = 0
-        # dv = 0
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[1])
-        out["cx"] = float(camera_params[2])
-        out["cy"] = float(camera_params[3])
-        out["k1"] = 0.0
-        out["k2"] = 0.0
-        out["p1"] = 0.0
-        out["p2"] = 0.0
-        camera_model = CameraModel.OPENCV
-    elif camera.model == "SIMPLE_RADIAL":
-        # f, cx, cy, k
-
-        # r2 = u**2 + v**2;
-        # radial = k * r2
-        # du = u * radial
-        # dv = u * radial
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[0])
-        out["cx"] = float(camera_params[1])
-        out["cy"] = float(camera_params[2])
-        out["k1"] = float(camera_params[3])
-        out["k2"] = 0.0
-        out["p1"] = 0.0
-        out["p2"] = 0.0
-        camera_model = CameraModel.OPENCV
-    elif camera.model == "RADIAL":
-        # f, cx, cy, k1, k2
-
-        # r2 = u**2 + v**2;
-        # radial = k1 * r2 + k2 * r2 ** 2
-        # du = u * radial
-        # dv = v * radial
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[0])
-        out["cx"] = float(camera_params[1])
-        out["cy"] = float(camera_params[2])
-        out["k1"] = float(camera_params[3])
-        out["k2"] = float(camera_params[4])
-        out["p1"] = 0.0
-        out["p2"] = 0.0
-        camera_model = CameraModel.OPENCV
-    elif camera.model == "OPENCV":
-        # fx, fy, cx, cy, k1, k2, p1, p2
-
-        # uv = u * v;
-        # r2 = u**2 + v**2
-        # radial = k1 * r2 + k2 * r2 ** 2
-        # du = u * radial + 2 * p1 * u*v + p2 * (r2 + 2 * u**2)
-        # dv = v * radial + 2 * p2 * u*v + p1 * (r2 + 2 * v**2)
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[1])
-        out["cx"] = float(camera_params[2])
-        out["cy"] = float(camera_params[3])
-        out["k1"] = float(camera_params[4])
-        out["k2"] = float(camera_params[5])
-        out["p1"] = float(camera_params[6])
-        out["p2"] = float(camera_params[7])
-        camera_model = CameraModel.OPENCV
-    elif camera.model == "OPENCV_FISHEYE":
-        # fx, fy, cx, cy, k1, k2, k3, k4
-
-        # r = sqrt(u**2 + v**2)
-
-        # if r > eps:
-        #    theta = atan(r)
-        #    theta2 = theta ** 2
-        #    theta4 = theta2 ** 2
-        #    theta6 = theta4 * theta2
-        #    theta8 = theta4 ** 2
-        #    thetad = theta * (1 + k1 * theta2 + k2 * theta4 + k3 * theta6 + k4 * theta8)
-        #    du = u * thetad / r - u;
-        #    dv = v * thetad / r - v;
-        # else:
-        #    du = dv = 0
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[1])
-        out["cx"] = float(camera_params[2])
-        out["cy"] = float(camera_params[3])
-        out["k1"] = float(camera_params[4])
-        out["k2"] = float(camera_params[5])
-        out["k3"] = float(camera_params[6])
-        out["k4"] = float(camera_params[7])
-        camera_model = CameraModel.OPENCV_FISHEYE
-    elif camera.model == "FULL_OPENCV":
-        # fx, fy, cx, cy, k1, k2, p1, p2, k3, k4, k5, k6
-
-        # u2 = u ** 2
-        # uv = u * v
-        # v2 = v ** 2
-        # r2 = u2 + v2
-        # r4 = r2 * r2
-        # r6 = r4 * r2
-        # radial = (1 + k1 * r2 + k2 * r4 + k3 * r6) /
-        #          (1 + k4 * r2 + k5 * r4 + k6 * r6)
-        # du = u * radial + 2 * p1 * uv + p2 * (r2 + 2 * u2) - u
-        # dv = v * radial + 2 * p2 * uv + p1 * (r2 + 2 * v2) - v
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[1])
-        out["cx"] = float(camera_params[2])
-        out["cy"] = float(camera_params[3])
-        out["k1"] = float(camera_params[4])
-        out["k2"] = float(camera_params[5])
-        out["p1"] = float(camera_params[6])
-        out["p2"] = float(camera_params[7])
-        out["k3"] = float(camera_params[8])
-        out["k4"] = float(camera_params[9])
-        out["k5"] = float(camera_params[10])
-        out["k6"] = float(camera_params[11])
-        raise NotImplementedError(f"{camera.model} camera model is not supported yet!")
-    elif camera.model == "FOV":
-        # fx, fy, cx, cy, omega
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[1])
-        out["cx"] = float(camera_params[2])
-        out["cy"] = float(camera_params[3])
-        out["omega"] = float(camera_params[4])
-        raise NotImplementedError(f"{camera.model} camera model is not supported yet!")
-    elif camera.model == "SIMPLE_RADIAL_FISHEYE":
-        # f, cx, cy, k
-
-        # r = sqrt(u ** 2 + v ** 2)
-        # if r > eps:
-        #     theta = atan(r)
-        #     theta2 = theta ** 2
-        #     thetad = theta * (1 + k * theta2)
-        #     du = u * thetad / r - u;
-        #     dv = v * thetad / r - v;
-        # else:
-        #     du = dv = 0
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[0])
-        out["cx"] = float(camera_params[1])
-        out["cy"] = float(camera_params[2])
-        out["k1"] = float(camera_params[3])
-        out["k2"] = 0.0
-        out["k3"] = 0.0
-        out["k4"] = 0.0
-        camera_model = CameraModel.OPENCV_FISHEYE
-    elif camera.model == "RADIAL_FISHEYE":
-        # f, cx, cy, k1, k2
-
-        # r = sqrt(u ** 2 + v ** 2)
-        # if r > eps:
-        #     theta = atan(r)
-        #     theta2 = theta ** 2
-        #     theta4 = theta2 ** 2
-        #     thetad = theta * (1 + k * theta2)
-        #     thetad = theta * (1 + k1 * theta2 + k2 * theta4)
-        #     du = u * thetad / r - u;
-        #     dv = v * thetad / r - v;
-        # else:
-        #     du = dv = 0
-        out["fl_x"] = float(camera_params[0])
-        out["fl_y"] = float(camera_params[0])
-        out["cx"] = float(camera_params[1])
-        out["cy"] = float(camera_params[2])
-        out["k1"] = float(camera_params[3])
-        out["k2"] = float(camera_params[4])
-        out["k3"] = 0
-        out["k4"] = 0
-        camera_model = CameraModel.OPENCV_FISHEYE
-    else:
-        # THIN_PRISM_FISHEYE not supported!
+    if camera.model not in COLMAP_CAMERA_PARAM_KEYS:
+        # FULL_OPENCV, FOV and THIN_PRISM_FISHEYE not supported!
         raise NotImplementedError(f"{camera.model} camera model is not supported yet!")
+    camera_model, param_keys = COLMAP_CAMERA_PARAM_KEYS[camera.model]
+    # Gather all parameters in one go, index -1 picks the appended zero for unused distortion terms
+    camera_params = np.append(np.asarray(camera.params, dtype=np.float64), 0.0)
+    param_indices = [param_index for _, param_index in param_keys]
+    out.update(zip([key for key, _ in param_keys], camera_params[param_indices].tolist()))
 
     out["camera_model"] = camera_model.value
     return out
 
 
+def _ndarray_to_list(obj: Any) -> Any:
+    """json.dump hook serializing NumPy arrays as nested lists."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 def colmap_to_json(
     recon_dir: Path,
     output_dir: Path,
@@ -397,7 +385,8 @@ def colmap_to_json(
     keep_original_world_coordinate: bool = False,
     use_single_camera_mode: bool = True,
 ) -> int:
-    """Converts COLMAP's cameras.bin and images.bin to a JSON file.
+    """Converts COLMAP's cameras.bin and images.bin to a JSON file. The poses, image paths, camera models and
+    intrinsics are also saved to poses.npz next to it.
 
     Args:
         recon_dir: Path to the reconstruction directory, e.g. "sparse/0"
@@ -427,27 +416,35 @@ def colmap_to_json(
     else:  # one camera for all frames
         out = parse_colmap_camera_params(cam_id_to_camera[1])
 
-    frames = []
-    for im_id, im_data in im_id_to_image.items():
-        # NB: COLMAP uses Eigen / scalar-first quaternions
-        # * https://colmap.github.io/format.html
-        # * https://github.com/colmap/colmap/blob/bf3e19140f491c3042bfd85b7192ef7d249808ec/src/base/pose.cc#L75
-        # the `rotation_matrix()` handles that format for us.
-
-        # TODO(1480) BEGIN use pycolmap API
-        # rotation = im_data.rotation_matrix()
-        rotation = qvec2rotmat(im_data.qvec)
-
-        translation = im_data.tvec.reshape(3, 1)
-        w2c = np.concatenate([rotation, translation], 1)
-        w2c = np.concatenate([w2c, np.array([[0, 0, 0, 1]])], 0)
-        c2w = np.linalg.inv(w2c)
-        # Convert from COLMAP's camera coordinate system (OpenCV) to ours (OpenGL)
-        c2w[0:3, 1:3] *= -1
-        if not keep_original_world_coordinate:
-            c2w = c2w[np.array([0, 2, 1, 3]), :]
-            c2w[2, :] *= -1
+    # Convert all poses at once instead of one small matrix at a time
+    num_images = len(im_id_to_image)
+    # NB: COLMAP uses Eigen / scalar-first quaternions
+    # * https://colmap.github.io/format.html
+    # * https://github.com/colmap/colmap/blob/bf3e19140f491c3042bfd85b7192ef7d249808ec/src/base/pose.cc#L75
+    # the `rotation_matrix()` handles that format for us.
+
+    # TODO(1480) BEGIN use pycolmap API
+    # rotation = im_data.rotation_matrix()
+    qvecs = np.array([im_data.qvec for im_data in im_id_to_image.values()], dtype=np.float64).reshape(num_images, 4)
+    tvecs = np.array([im_data.tvec for im_data in im_id_to_image.values()], dtype=np.float64).reshape(num_images, 3)
+    rotations = qvecs2rotmats(qvecs)
+    # World-to-camera poses are rigid, so invert them in closed form: c2w = [R^T | -R^T t].
+    # Both parts are written straight into a single float64 buffer; float32 would lose centimetres on scenes with
+    # large (e.g. georeferenced) coordinates.
+    c2w = np.empty((num_images, 4, 4), dtype=np.float64)
+    c2w[:, 3, :3] = 0
+    c2w[:, 3, 3] = 1
+    c2w[:, :3, :3] = rotations.transpose(0, 2, 1)
+    c2w[:, :3, 3] = -np.einsum("nji,nj->ni", rotations, tvecs)
+    # Convert from COLMAP's camera coordinate system (OpenCV) to ours (OpenGL)
+    c2w[:, 0:3, 1:3] *= -1
+    if not keep_original_world_coordinate:
+        c2w[:, [1, 2], :] = c2w[:, [2, 1], :]
+        c2w[:, 2, :] *= -1
 
+    frames = []
+    file_paths = []
+    for i, (im_id, im_data) in enumerate(im_id_to_image.items()):
         name = im_data.name
         if image_rename_map is not None:
             name = image_rename_map[name]
@@ -455,7 +452,7 @@ def colmap_to_json(
 
         frame = {
             "file_path": name.as_posix(),
-            "transform_matrix": c2w.tolist(),
+            "transform_matrix": c2w[i],
             "colmap_im_id": im_id,
         }
         if camera_mask_path is not None:
@@ -468,6 +465,7 @@ def colmap_to_json(
             frame.update(parse_colmap_camera_params(cam_id_to_camera[im_data.camera_id]))
 
         frames.append(frame)
+        file_paths.append(frame["file_path"])
 
     out["frames"] = frames
 
@@ -488,8 +486,32 @@ def colmap_to_json(
     )
     out["ply_file_path"] = ply_filename
 
-    with open(output_dir / "transforms.json", "w", encoding="utf-8") as f:
-        json.dump(out, f, indent=4)
+    if orjson is not None:
+        # orjson serializes the pose arrays natively, without converting each matrix to nested lists
+        (output_dir / "transforms.json").write_bytes(
+            orjson.dumps(out, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+        )
+    else:
+        # Same indentation and key layout as orjson's output; float formatting differs (e.g. 1e-05 vs 0.00001), so
+        # the bytes of transforms.json still depend on whether orjson is installed
+        with open(output_dir / "transforms.json", "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2, ensure_ascii=False, default=_ndarray_to_list)
+
+    # Binary copy of the poses for consumers that don't want to parse the JSON. The layout of the intrinsics depends
+    # on the camera model, so the model and the parameter names are stored with them.
+    cameras = [out] if use_single_camera_mode else frames
+    camera_models = [camera["camera_model"] for camera in cameras]
+    intrinsics_keys = [POSES_NPZ_INTRINSICS_KEYS[camera_model] for camera_model in camera_models]
+    npz_cameras = {
+        "camera_model": np.array(camera_models),
+        "intrinsics_keys": np.array(intrinsics_keys),
+        "intrinsics": np.array(
+            [[camera[key] for key in keys] for camera, keys in zip(cameras, intrinsics_keys)], dtype=np.float32
+        ),
+    }
+    if use_single_camera_mode:
+        npz_cameras = {name: array[0] for name, array in npz_cameras.items()}
+    np.savez(output_dir / "poses.npz", c2w=c2w.astype(np.float32), names=np.array(file_paths), **npz_cameras)
 
     return len(frames)
 
@@ -616,7 +638,8 @@ def create_sfm_depth(
 
         out_name = str(im_data.name)
         depth_path = output_dir / out_name
-        if depth_path.suffix == ".jpg":
+        # uint16 depth needs PNG, e.g. OpenCV's WebP encoder would clip it to 8 bits
+        if depth_path.suffix.lower() != ".png":
             depth_path = depth_path.with_suffix(".png")
         cv2.imwrite(str(depth_path), depth_img)  # type: ignore
 
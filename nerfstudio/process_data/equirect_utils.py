@@ -304,7 +304,7 @@ def generate_planar_projections_from_equirectangular(
 
     with progress:
         for i in progress.track(os.listdir(frame_dir), description="", total=num_ims):
-            if i.lower().endswith((".jpg", ".png", ".jpeg", ".tiff", ".tif")):
+            if i.lower().endswith((".jpg", ".png", ".jpeg", ".webp", ".tiff", ".tif")):
                 im = np.array(cv2.imread(os.path.join(frame_dir, i)))
                 im = torch.tensor(im, dtype=torch.float32, device=device)
                 im = torch.permute(im, (2, 0, 1)).unsqueeze(0) / 255.0
@@ -314,7 +314,7 @@ def generate_planar_projections_from_equirectangular(
                         equirect2persp(im, fov, u_deg, v_deg, planar_image_size[1], planar_image_size[0]) * 255.0
                     )
                     pers_image = omnicv_pers_tensor.squeeze().permute(1, 2, 0).type(torch.uint8).to("cpu").numpy()
-                    cv2.imwrite(f"{output_dir}/{i[:-4]}_{count}.jpg", pers_image)
+                    cv2.imwrite(f"{output_dir}/{os.path.splitext(i)[0]}_{count}.jpg", pers_image)
                     count += 1
 
     return output_dir
@@ -331,7 +331,7 @@ def compute_resolution_from_equirect(image_dir: Path, num_images: int) -> Tuple[
     """
 
     for i in os.listdir(image_dir):
-        if i.lower().endswith((".jpg", ".png", ".jpeg", ".tiff", ".tif")):
+        if i.lower().endswith((".jpg", ".png", ".jpeg", ".webp", ".tiff", ".tif")):
             im = np.array(cv2.imread(os.path.join(image_dir, i)))
             res_squared = (im.shape[0] * im.shape[1]) / num_images
             return (int(np.sqrt(res_squared)), int(np.sqrt(res_squared)))
@@ -17,7 +17,6 @@
 from dataclasses import dataclass
 from typing import Optional
 
-from nerfstudio.process_data import equirect_utils, process_data_utils
 from nerfstudio.process_data.colmap_converter_to_nerfstudio_dataset import ColmapConverterToNerfstudioDataset
 from nerfstudio.utils.rich_utils import CONSOLE
 
@@ -35,6 +34,7 @@ class ImagesToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        from nerfstudio.process_data import equirect_utils, process_data_utils
 
         require_cameras_exist = False
         if self.colmap_model_path != ColmapConverterToNerfstudioDataset.default_colmap_path():
@@ -14,11 +14,14 @@
 
 """Helper utils for processing data into the nerfstudio format."""
 
+import json
 import math
 import random
 import re
+import shlex
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
 from typing import List, Literal, Optional, OrderedDict, Tuple, Union
@@ -32,9 +35,11 @@ except ImportError:
     import newrawpy as rawpy  # type: ignore
 
 import numpy as np
+from PIL import Image
 
+from nerfstudio.utils.install_checks import get_ffmpeg_filters, get_ffmpeg_hwaccels
 from nerfstudio.utils.rich_utils import CONSOLE, status
-from nerfstudio.utils.scripts import run_command
+from nerfstudio.utils.scripts import run_command, try_run_command
 
 POLYCAM_UPSCALING_TIMES = 2
 
@@ -42,6 +47,28 @@ POLYCAM_UPSCALING_TIMES = 2
 ALLOWED_RAW_EXTS = [".cr2"]
 """Suffix to use for converted images from raw."""
 RAW_CONVERTED_SUFFIX = ".jpg"
+"""Per-format ffmpeg output options used when writing extracted video frames."""
+FRAME_FORMAT_OUTPUT_ARGS = {
+    "png": [],
+    "jpg": ["-q:v", "2", "-pix_fmt", "yuvj420p"],
+    "webp": ["-lossless", "1"],
+}
+"""Per image suffix, the Pillow save options of downscaled images. WebP is kept lossless like the extracted frames."""
+DOWNSCALE_SAVE_KWARGS = {
+    ".jpg": {"quality": 95},
+    ".jpeg": {"quality": 95},
+    ".webp": {"lossless": True},
+}
+"""Number of trailing ffmpeg error lines shown when decoding on the GPU fails."""
+CUDA_FALLBACK_STDERR_LINES = 20
+"""Software formats NVDEC frames are downloaded as, per source pixel format. Other sources are decoded on the CPU."""
+CUDA_DOWNLOAD_PIXEL_FORMATS = {
+    "yuv420p": "nv12",
+    "yuvj420p": "nv12",
+    "nv12": "nv12",
+    "yuv420p10le": "p010le",
+    "p010le": "p010le",
+}
 
 
 class CameraModel(Enum):
@@ -72,7 +99,7 @@ def list_images(data: Path, recursive: bool = True) -> List[Path]:
     Returns:
         Paths to images contained in the directory
     """
-    allowed_exts = [".jpg", ".jpeg", ".png", ".tif", ".tiff"] + ALLOWED_RAW_EXTS
+    allowed_exts = [".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"] + ALLOWED_RAW_EXTS
     glob_str = "**/[!.]*" if recursive else "[!.]*"
     image_paths = sorted([p for p in data.glob(glob_str) if p.suffix.lower() in allowed_exts])
     return image_paths
@@ -103,14 +130,58 @@ def get_image_filenames(directory: Path, max_num_images: int = -1) -> Tuple[List
 def get_num_frames_in_video(video: Path) -> int:
     """Returns the number of frames in a video.
 
+    The count is read from the container header when possible (or estimated from the duration and average frame rate),
+    only falling back to counting every packet in the video if neither is available.
+
     Args:
         video: Path to a video.
 
     Returns:
         The number of frames in a video.
     """
-    cmd = f'ffprobe -v error -select_streams v:0 -count_packets \
-            -show_entries stream=nb_read_packets -of csv=p=0 "{video}"'
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=nb_frames,avg_frame_rate,r_frame_rate,duration:format=duration",
+        "-of",
+        "json",
+        str(video),
+    ]
+    output = run_command(cmd)
+    assert output is not None
+    probe = json.loads(output)
+    if len(probe.get("streams", [])) == 0:
+        return 0
+    stream = probe["streams"][0]
+    nb_frames = stream.get("nb_frames", "N/A")
+    if nb_frames.isdigit():
+        return int(nb_frames)
+    # Some containers (e.g. mkv, webm) don't store the frame count, estimate it from the duration instead. Prefer the
+    # average frame rate, r_frame_rate can be a timebase-level rate (e.g. 90000/1) for variable frame rate videos.
+    duration = stream.get("duration", probe.get("format", {}).get("duration", "N/A"))
+    for frame_rate in (stream.get("avg_frame_rate", ""), stream.get("r_frame_rate", "")):
+        # Unknown rates are reported as "0/0"
+        frame_rate_match = re.fullmatch(r"([1-9]\d*)/([1-9]\d*)", frame_rate)
+        if duration != "N/A" and frame_rate_match is not None:
+            return int(float(duration) * int(frame_rate_match[1]) / int(frame_rate_match[2]))
+
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-count_packets",
+        "-show_entries",
+        "stream=nb_read_packets",
+        "-of",
+        "csv=p=0",
+        str(video),
+    ]
     output = run_command(cmd)
     assert output is not None
     number_match = re.search(r"\d+", output)
@@ -118,6 +189,21 @@ def get_num_frames_in_video(video: Path) -> int:
     return int(number_match[0])
 
 
+def get_video_pixel_format(video: Path) -> str:
+    """Returns the pixel format of the first video stream, e.g. "yuv420p".
+
+    Args:
+        video: Path to a video.
+
+    Returns:
+        The ffmpeg name of the pixel format, or an empty string if the video has no video stream.
+    """
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=pix_fmt", "-of", "csv=p=0"]
+    output = run_command([*cmd, str(video)])
+    assert output is not None
+    return output.strip()
+
+
 def convert_video_to_images(
     video_path: Path,
     image_dir: Path,
@@ -128,6 +214,8 @@ def convert_video_to_images(
     image_prefix: str = "frame_",
     keep_image_dir: bool = False,
     random_seed: Optional[int] = None,
+    image_format: Literal["png", "jpg", "webp"] = "jpg",
+    gpu: bool = False,
 ) -> Tuple[List[str], int]:
     """Converts a video into a sequence of images.
 
@@ -141,6 +229,10 @@ def convert_video_to_images(
         image_prefix: Prefix to use for the image filenames.
         keep_image_dir: If True, don't delete the output directory if it already exists.
         random_seed: If set, the seed used to choose the frames of the video
+        image_format: Image format of the extracted frames. JPEG is much cheaper to encode and store than PNG,
+            use PNG or (lossless) WebP if lossless frames are needed.
+        gpu: If True and ffmpeg supports CUDA decoding and scale_cuda, decode and downscale the video on the GPU.
+            Falls back to the CPU if that fails.
     Returns:
         A tuple containing summary of the conversion and the number of extracted frames.
     """
@@ -171,7 +263,10 @@ def convert_video_to_images(
             sys.exit(1)
         CONSOLE.print("Number of frames in video:", num_frames)
 
-        ffmpeg_cmd = f'ffmpeg -i "{video_path}"'
+        # Only decode on the GPU if ffmpeg can also scale there and NVDEC outputs a format we can download
+        cuda_download_format = None
+        if gpu and "cuda" in get_ffmpeg_hwaccels() and "scale_cuda" in get_ffmpeg_filters():
+            cuda_download_format = CUDA_DOWNLOAD_PIXEL_FORMATS.get(get_video_pixel_format(video_path))
 
         crop_cmd = ""
         if crop_factor != (0.0, 0.0, 0.0, 0.0):
@@ -181,46 +276,74 @@ def convert_video_to_images(
             start_y = crop_factor[0]
             crop_cmd = f"crop=w=iw*{width}:h=ih*{height}:x=iw*{start_x}:y=ih*{start_y},"
 
-        downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}[out{i}]" for i in range(num_downscales + 1)]
         downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
-        downscale_paths = [downscale_dirs[i] / f"{image_prefix}%05d.png" for i in range(num_downscales + 1)]
+        downscale_paths = [downscale_dirs[i] / f"{image_prefix}%05d.{image_format}" for i in range(num_downscales + 1)]
 
         for dir in downscale_dirs:
             dir.mkdir(parents=True, exist_ok=True)
 
-        downscale_chain = (
-            f"split={num_downscales + 1}"
-            + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
-            + ";"
-            + ";".join(downscale_chains)
-        )
-
-        ffmpeg_cmd += " -vsync vfr"
-
         # Evenly distribute frame selection if random seed does not exist
         spacing = num_frames // num_frames_target
+        output_pix_fmt_args = []
         if random_seed:
             random.seed(random_seed)
             frame_indices = sorted(random.sample(range(num_frames), num_frames_target))
-            select_cmd = "select='" + "+".join([f"eq(n\,{idx})" for idx in frame_indices]) + "',setpts=N/TB,"
+            select_cmd = "select='" + "+".join([rf"eq(n\,{idx})" for idx in frame_indices]) + "',setpts=N/TB,"
             CONSOLE.print(f"Extracting {num_frames_target} frames using seed {random_seed} random selection.")
         elif spacing > 1:
             CONSOLE.print(f"Extracting {math.ceil(num_frames / spacing)} frames in evenly spaced intervals")
-            select_cmd = f"thumbnail={spacing},setpts=N/TB,"
+            # Plain decimation; the thumbnail filter's per-window frame scoring is not needed here
+            select_cmd = f"select='not(mod(n\\,{spacing}))',setpts=N/TB,"
         else:
             CONSOLE.print("[bold red]Can't satisfy requested number of frames. Extracting all frames.")
-            ffmpeg_cmd += " -pix_fmt bgr8"
+            if image_format == "png":
+                output_pix_fmt_args = ["-pix_fmt", "bgr8"]
             select_cmd = ""
 
-        downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
-            [f' -map "[out{i}]" "{downscale_paths[i]}"' for i in range(num_downscales + 1)]
-        )
-
-        ffmpeg_cmd += downscale_cmd
-
-        run_command(ffmpeg_cmd, verbose=verbose)
-
-        num_final_frames = len(list(image_dir.glob("*.png")))
+        def get_ffmpeg_cmd(download_format: Optional[str]) -> List[str]:
+            """Builds the ffmpeg command, decoding on the GPU and downloading as download_format if it is set."""
+            ffmpeg_cmd = ["ffmpeg", "-threads", "0"]
+            if download_format is not None:
+                # Keep decoded frames on the GPU until the downscaled images are encoded
+                ffmpeg_cmd += ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"]
+                # crop only works on CPU frames, so it is applied to each branch after hwdownload
+                branch_crop_cmd = f",{crop_cmd[:-1]}" if crop_cmd else ""
+                downscale_chains = [
+                    f"[t{i}]scale_cuda=iw/{2**i}:ih/{2**i},hwdownload,format={download_format}{branch_crop_cmd}[out{i}]"
+                    for i in range(num_downscales + 1)
+                ]
+                filter_crop_cmd = ""
+            else:
+                downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}[out{i}]" for i in range(num_downscales + 1)]
+                filter_crop_cmd = crop_cmd
+            downscale_chain = (
+                f"split={num_downscales + 1}"
+                + "".join([f"[t{i}]" for i in range(num_downscales + 1)])
+                + ";"
+                + ";".join(downscale_chains)
+            )
+            ffmpeg_cmd += ["-i", str(video_path), "-vsync", "vfr", *output_pix_fmt_args]
+            ffmpeg_cmd += ["-filter_complex", f"{select_cmd}{filter_crop_cmd}{downscale_chain}"]
+            for i in range(num_downscales + 1):
+                ffmpeg_cmd += ["-map", f"[out{i}]", *FRAME_FORMAT_OUTPUT_ARGS[image_format], str(downscale_paths[i])]
+            return ffmpeg_cmd
+
+        decoded_on_gpu = False
+        if cuda_download_format is not None:
+            cuda_out = try_run_command(get_ffmpeg_cmd(cuda_download_format), verbose=verbose)
+            decoded_on_gpu = cuda_out.returncode == 0
+            if not decoded_on_gpu:
+                # e.g. no NVIDIA driver, or a codec NVDEC can't decode; remove partial frames before retrying
+                CONSOLE.print("[bold yellow]Decoding the video on the GPU failed, decoding it on the CPU instead.")
+                if cuda_out.stderr:
+                    CONSOLE.print("\n".join(cuda_out.stderr.splitlines()[-CUDA_FALLBACK_STDERR_LINES:]), markup=False)
+                for downscale_dir in downscale_dirs:
+                    for frame_path in downscale_dir.glob(f"{image_prefix}*.{image_format}"):
+                        frame_path.unlink()
+        if not decoded_on_gpu:
+            run_command(get_ffmpeg_cmd(None), verbose=verbose)
+
+        num_final_frames = len(list(image_dir.glob(f"*.{image_format}")))
         summary_log = []
         summary_log.append(f"Starting with {num_frames} video frames")
         summary_log.append(f"We extracted {num_final_frames} images with prefix '{image_prefix}'")
@@ -286,14 +409,27 @@ def copy_images_list(
                 shutil.copy(image_path, copied_image_path)
             else:
                 # Slow path; let ffmpeg perform autorotation (and clear metadata)
-                ffmpeg_cmd = f"ffmpeg -y -i {image_path} -metadata:s:v:0 rotate=0 {copied_image_path}"
+                ffmpeg_cmd = [
+                    "ffmpeg",
+                    "-y",
+                    "-i",
+                    str(image_path),
+                    "-metadata:s:v:0",
+                    "rotate=0",
+                    *(FRAME_FORMAT_OUTPUT_ARGS["webp"] if copied_image_path.suffix.lower() == ".webp" else []),
+                    str(copied_image_path),
+                ]
                 if verbose:
-                    CONSOLE.log(f"... {ffmpeg_cmd}")
+                    CONSOLE.log(f"... {shlex.join(ffmpeg_cmd)}")
                 run_command(ffmpeg_cmd, verbose=verbose)
         except shutil.SameFileError:
             pass
         copied_image_paths.append(copied_image_path)
 
+    image_suffix = copied_image_paths[0].suffix if copied_image_paths else ""
+    # -q:v is a quality scale for JPEG, but a 0-100 quality for libwebp, where 2 would be near the worst
+    output_args = FRAME_FORMAT_OUTPUT_ARGS["webp"] if image_suffix.lower() == ".webp" else ["-q:v", "2"]
+
     nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
     downscale_chains = [f"[t{i}]scale=iw/{2**i}:ih/{2**i}{nn_flag}[out{i}]" for i in range(num_downscales + 1)]
     downscale_dirs = [Path(str(image_dir) + (f"_{2**i}" if i > 0 else "")) for i in range(num_downscales + 1)]
@@ -314,7 +450,8 @@ def copy_images_list(
     # (Unfortunately, that is much slower.)
     for framenum in range(1, (1 if same_dimensions else num_frames) + 1):
         framename = f"{image_prefix}%05d" if same_dimensions else f"{image_prefix}{framenum:05d}"
-        ffmpeg_cmd = f'ffmpeg -y -noautorotate -i "{image_dir / f"{framename}{copied_image_paths[0].suffix}"}" '
+        input_path = image_dir / f"{framename}{image_suffix}"
+        ffmpeg_cmd = ["ffmpeg", "-y", "-noautorotate", "-i", str(input_path)]
 
         crop_cmd = ""
         if crop_border_pixels is not None:
@@ -330,16 +467,12 @@ def copy_images_list(
         if upscale_factor is not None:
             select_cmd = f"[0:v]scale=iw*{upscale_factor}:ih*{upscale_factor}:flags=neighbor[upscaled];[upscaled]"
 
-        downscale_cmd = f' -filter_complex "{select_cmd}{crop_cmd}{downscale_chain}"' + "".join(
-            [
-                f' -map "[out{i}]" -q:v 2 "{downscale_dirs[i] / f"{framename}{copied_image_paths[0].suffix}"}"'
-                for i in range(num_downscales + 1)
-            ]
-        )
-
-        ffmpeg_cmd += downscale_cmd
+        ffmpeg_cmd += ["-filter_complex", f"{select_cmd}{crop_cmd}{downscale_chain}"]
+        for i in range(num_downscales + 1):
+            output_path = downscale_dirs[i] / f"{framename}{image_suffix}"
+            ffmpeg_cmd += ["-map", f"[out{i}]", *output_args, str(output_path)]
         if verbose:
-            CONSOLE.log(f"... {ffmpeg_cmd}")
+            CONSOLE.log(f"... {shlex.join(ffmpeg_cmd)}")
         run_command(ffmpeg_cmd, verbose=verbose)
 
     if num_frames == 0:
@@ -442,16 +575,19 @@ def downscale_images(
     folder_name: str = "images",
     nearest_neighbor: bool = False,
     verbose: bool = False,
+    show_status: bool = True,
 ) -> str:
     """(Now deprecated; much faster integrated into copy_images.)
-    Downscales the images in the directory. Uses FFMPEG.
+    Downscales the images in the directory. Uses Pillow, decoding each image once and writing
+    all downscale levels from it.
 
     Args:
         image_dir: Path to the directory containing the images.
         num_downscales: Number of times to downscale the images. Downscales by 2 each time.
         folder_name: Name of the output folder
         nearest_neighbor: Use nearest neighbor sampling (useful for depth images)
-        verbose: If True, logs the output of the command.
+        verbose: If True, print extra logging.
+        show_status: If False, don't show a status spinner, e.g. when running alongside another status display.
 
     Returns:
         Summary of downscaling.
@@ -463,25 +599,33 @@ def downscale_images(
     with status(
         msg="[bold yellow]Downscaling images...",
         spinner="growVertical",
-        verbose=verbose,
+        verbose=verbose or not show_status,
     ):
         downscale_factors = [2**i for i in range(num_downscales + 1)[1:]]
+        downscale_dirs = []
         for downscale_factor in downscale_factors:
             assert downscale_factor > 1
             assert isinstance(downscale_factor, int)
             downscale_dir = image_dir.parent / f"{folder_name}_{downscale_factor}"
             downscale_dir.mkdir(parents=True, exist_ok=True)
-            # Using %05d ffmpeg commands appears to be unreliable (skips images).
-            for f in list_images(image_dir):
-                filename = f.name
-                nn_flag = "" if not nearest_neighbor else ":flags=neighbor"
-                ffmpeg_cmd = [
-                    f'ffmpeg -y -noautorotate -i "{image_dir / filename}" ',
-                    f"-q:v 2 -vf scale=iw/{downscale_factor}:ih/{downscale_factor}{nn_flag} ",
-                    f'"{downscale_dir / filename}"',
-                ]
-                ffmpeg_cmd = " ".join(ffmpeg_cmd)
-                run_command(ffmpeg_cmd, verbose=verbose)
+            downscale_dirs.append(downscale_dir)
+
+        # Box filtering by an integer factor averages each factor x factor block, like an area resize
+        resample = Image.Resampling.NEAREST if nearest_neighbor else Image.Resampling.BOX
+
+        def downscale_image(image_path: Path) -> None:
+            with Image.open(image_path) as image:
+                image.load()
+                save_kwargs = DOWNSCALE_SAVE_KWARGS.get(image_path.suffix.lower(), {})
+                for downscale_factor, downscale_dir in zip(downscale_factors, downscale_dirs):
+                    size = (image.width // downscale_factor, image.height // downscale_factor)
+                    image.resize(size, resample=resample).save(downscale_dir / image_path.name, **save_kwargs)
+            if verbose:
+                CONSOLE.log(f"Downscaled {image_path.name}")
+
+        # Pillow releases the GIL while decoding, resizing and encoding, so images are processed in parallel
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(downscale_image, list_images(image_dir)))
 
     CONSOLE.log("[bold green]:tada: Done downscaling images.")
     downscale_text = [f"[bold blue]{2 ** (i + 1)}x[/bold blue]" for i in range(num_downscales)]
@@ -15,10 +15,10 @@
 """Processes a video to a nerfstudio compatible dataset."""
 
 import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Literal, Optional
 
-from nerfstudio.process_data import equirect_utils, process_data_utils
 from nerfstudio.process_data.colmap_converter_to_nerfstudio_dataset import ColmapConverterToNerfstudioDataset
 from nerfstudio.utils.rich_utils import CONSOLE
 
@@ -45,12 +45,16 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
     """Random seed to select video frames for training set"""
     eval_random_seed: Optional[int] = None
     """Random seed to select video frames for eval set"""
+    frame_format: Literal["png", "jpg", "webp"] = "jpg"
+    """Image format of the extracted frames. Use png or webp for lossless frames."""
 
     def main(self) -> None:
         """Process video into a nerfstudio dataset."""
+        from nerfstudio.process_data import equirect_utils, process_data_utils
 
         summary_log = []
         summary_log_eval = []
+        downscale_future: Optional[Future] = None
         # Convert video to images
         if self.camera_type == "equirectangular":
             # create temp images folder to store the equirect and perspective images
@@ -64,6 +68,7 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                 crop_factor=(0.0, 0.0, 0.0, 0.0),
                 verbose=self.verbose,
                 random_seed=self.random_seed,
+                image_format=self.frame_format,
             )
         else:
             # If we're not dealing with equirects we can downscale in one step.
@@ -77,6 +82,8 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                 image_prefix="frame_train_" if self.eval_data is not None else "frame_",
                 keep_image_dir=False,
                 random_seed=self.random_seed,
+                image_format=self.frame_format,
+                gpu=self.gpu,
             )
             if self.eval_data is not None:
                 summary_log_eval, num_extracted_frames_eval = process_data_utils.convert_video_to_images(
@@ -89,6 +96,8 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
                     image_prefix="frame_eval_",
                     keep_image_dir=True,
                     random_seed=self.eval_random_seed,
+                    image_format=self.frame_format,
+                    gpu=self.gpu,
                 )
                 summary_log += summary_log_eval
                 num_extracted_frames += num_extracted_frames_eval
@@ -121,10 +130,16 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
 
             self.camera_type = "perspective"
 
-            # # Downscale images
-            summary_log.append(
-                process_data_utils.downscale_images(self.image_dir, self.num_downscales, verbose=self.verbose)
+            # Downscale images in the background, COLMAP only needs the full resolution images
+            downscale_executor = ThreadPoolExecutor(max_workers=1)
+            downscale_future = downscale_executor.submit(
+                process_data_utils.downscale_images,
+                self.image_dir,
+                self.num_downscales,
+                verbose=self.verbose,
+                show_status=False,
             )
+            downscale_executor.shutdown(wait=False)
 
         # Create mask
         mask_path = process_data_utils.save_mask(
@@ -140,6 +155,9 @@ class VideoToNerfstudioDataset(ColmapConverterToNerfstudioDataset):
         if not self.skip_colmap:
             self._run_colmap(mask_path)
 
+        if downscale_future is not None:
+            summary_log.append(downscale_future.result())
+
         # Export depth maps
         image_id_to_depth_path, log_tmp = self._export_depth()
         summary_log += log_tmp
@@ -21,18 +21,11 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Union
 
-import numpy as np
 import tyro
 from typing_extensions import Annotated
 
-from nerfstudio.process_data import (
-    metashape_utils,
-    odm_utils,
-    polycam_utils,
-    process_data_utils,
-    realitycapture_utils,
-    record3d_utils,
-)
+# NOTE: the processing utils (and numpy, cv2, open3d, torch with them) are imported inside each main(), here and in
+# the converters in nerfstudio.process_data, so that the CLI, e.g. --help, starts quickly.
 from nerfstudio.process_data.colmap_converter_to_nerfstudio_dataset import BaseConverterToNerfstudioDataset
 from nerfstudio.process_data.images_to_nerfstudio_dataset import ImagesToNerfstudioDataset
 from nerfstudio.process_data.video_to_nerfstudio_dataset import VideoToNerfstudioDataset
@@ -63,6 +56,9 @@ class ProcessRecord3D(BaseConverterToNerfstudioDataset):
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        import numpy as np
+
+        from nerfstudio.process_data import process_data_utils, record3d_utils
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
         image_dir = self.output_dir / "images"
@@ -152,6 +148,7 @@ class ProcessPolycam(BaseConverterToNerfstudioDataset):
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        from nerfstudio.process_data import polycam_utils
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
         image_dir = self.output_dir / "images"
@@ -266,6 +263,7 @@ class ProcessMetashape(BaseConverterToNerfstudioDataset, _NoDefaultProcessMetash
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        from nerfstudio.process_data import metashape_utils, process_data_utils
 
         if self.xml.suffix != ".xml":
             raise ValueError(f"XML file {self.xml} must have a .xml extension")
@@ -363,6 +361,7 @@ class ProcessRealityCapture(BaseConverterToNerfstudioDataset, _NoDefaultProcessR
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        from nerfstudio.process_data import process_data_utils, realitycapture_utils
 
         if self.csv.suffix != ".csv":
             raise ValueError(f"CSV file {self.csv} must have a .csv extension")
@@ -446,6 +445,7 @@ class ProcessODM(BaseConverterToNerfstudioDataset):
 
     def main(self) -> None:
         """Process images into a nerfstudio dataset."""
+        from nerfstudio.process_data import odm_utils, process_data_utils
 
         orig_images_dir = self.data / "images"
         cameras_file = self.data / "cameras.json"
@@ -14,12 +14,24 @@
 
 """Helpers for checking if programs are installed"""
 
+import functools
+import os
+import re
+import shlex
 import shutil
 import subprocess
 import sys
+from typing import FrozenSet, List
+
+from packaging.version import Version
 
 from nerfstudio.utils.rich_utils import CONSOLE
 
+"""Matches the version in the first line of COLMAP's help output, e.g. "COLMAP 3.8 -- Structure-from-Motion"."""
+COLMAP_VERSION_PATTERN = re.compile(r"^COLMAP\s+(\d+(?:\.\d+)*)", re.MULTILINE)
+"""Matches a leading shell environment variable assignment such as QT_QPA_PLATFORM=offscreen."""
+ENV_ASSIGNMENT_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
 
 def check_ffmpeg_installed():
     """Checks if ffmpeg is installed."""
@@ -30,10 +42,94 @@ def check_ffmpeg_installed():
         sys.exit(1)
 
 
+@functools.lru_cache(maxsize=1)
+def get_ffmpeg_hwaccels() -> FrozenSet[str]:
+    """Returns the hardware acceleration methods ffmpeg was built with. The result is cached."""
+    try:
+        out = subprocess.run(["ffmpeg", "-hide_banner", "-hwaccels"], capture_output=True, check=False)
+    except OSError:
+        return frozenset()
+    if out.returncode != 0:
+        return frozenset()
+    # The first line is the "Hardware acceleration methods:" header
+    return frozenset(line.strip() for line in out.stdout.decode("utf-8").splitlines()[1:] if line.strip())
+
+
+@functools.lru_cache(maxsize=1)
+def get_ffmpeg_filters() -> FrozenSet[str]:
+    """Returns the names of the filters ffmpeg was built with. The result is cached."""
+    try:
+        out = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, check=False)
+    except OSError:
+        return frozenset()
+    if out.returncode != 0:
+        return frozenset()
+    # Filter lines look like " ... scale_cuda        V->V       GPU accelerated video resizer", skip the legend
+    filters = set()
+    for line in out.stdout.decode("utf-8", errors="replace").splitlines():
+        fields = line.split()
+        if len(fields) >= 3 and "->" in fields[2]:
+            filters.add(fields[1])
+    return frozenset(filters)
+
+
+def get_colmap_argv(colmap_cmd: str) -> List[str]:
+    """Splits the COLMAP command into arguments, resolving the executable on the PATH. Resolving it also finds
+    wrappers such as COLMAP.bat on Windows, which can then be run without a shell.
+
+    Args:
+        colmap_cmd: How to call the COLMAP executable, e.g. "colmap" or "/opt/colmap/bin/colmap".
+    Returns:
+        The arguments to run COLMAP with.
+    Raises:
+        ValueError: If the command starts with an environment variable assignment, e.g. "QT_QPA_PLATFORM=offscreen".
+        FileNotFoundError: If the COLMAP executable can't be found.
+    """
+    colmap_argv = shlex.split(colmap_cmd, posix=os.name != "nt")
+    if len(colmap_argv) > 0 and ENV_ASSIGNMENT_PATTERN.match(colmap_argv[0]):
+        raise ValueError(f"COLMAP command {colmap_cmd!r} starts with an environment variable assignment")
+    executable = shutil.which(colmap_argv[0]) if len(colmap_argv) > 0 else None
+    if executable is None:
+        raise FileNotFoundError(f"Could not find the COLMAP executable of {colmap_cmd!r}")
+    return [executable, *colmap_argv[1:]]
+
+
+@functools.lru_cache(maxsize=None)
+def get_colmap_version(colmap_cmd: str, default_version: str = "3.8") -> Version:
+    """Returns the version of COLMAP. The result is cached, so COLMAP is only probed once per command.
+    This code assumes that colmap returns a version string of the form
+    "COLMAP 3.8 ..." which may not be true for all versions of COLMAP.
+
+    Args:
+        colmap_cmd: How to call the COLMAP executable.
+        default_version: Default version to return if COLMAP version can't be determined.
+    Returns:
+        The version of COLMAP.
+    Raises:
+        ValueError: If the command starts with an environment variable assignment.
+        OSError: If the COLMAP executable can't be run.
+        subprocess.CalledProcessError: If COLMAP exits with an error.
+    """
+    out = subprocess.run([*get_colmap_argv(colmap_cmd), "-h"], capture_output=True, check=True)
+    version_match = COLMAP_VERSION_PATTERN.search(out.stdout.decode("utf-8", errors="replace"))
+    if version_match is not None:
+        return Version(version_match[1])
+    CONSOLE.print(f"[bold red]Could not find COLMAP version. Using default {default_version}")
+    return Version(default_version)
+
+
 def check_colmap_installed(colmap_cmd: str):
     """Checks if colmap is installed."""
-    out = subprocess.run(f"{colmap_cmd} -h", capture_output=True, shell=True, check=False)
-    if out.returncode != 0:
+    try:
+        get_colmap_version(colmap_cmd)
+    except ValueError:
+        CONSOLE.print(f"[bold red]Invalid COLMAP command: {colmap_cmd}")
+        print(
+            "COLMAP is run without a shell, set environment variables when calling ns-process-data instead, "
+            "e.g. QT_QPA_PLATFORM=offscreen ns-process-data ..."
+        )
+        sys.exit(1)
+    except (OSError, subprocess.CalledProcessError):
         CONSOLE.print("[bold red]Could not find COLMAP. Please install COLMAP.")
         print("See https://colmap.github.io/install.html for installation instructions.")
         sys.exit(1)
@@ -13,29 +13,74 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import shlex
 import subprocess
 import sys
-from typing import Optional
+import threading
+from typing import Deque, List, Optional, Union
 
 from nerfstudio.utils.rich_utils import CONSOLE
 
+"""Number of trailing stderr lines kept to report a failing command."""
+STDERR_TAIL_LINES = 1000
+"""Pipe buffer size; large buffers reduce syscalls for chatty programs such as COLMAP."""
+PIPE_BUFFER_SIZE = 1 << 20
 
-def run_command(cmd: str, verbose=False) -> Optional[str]:
-    """Runs a command and returns the output.
+
+def try_run_command(cmd: Union[str, List[str]], verbose=False) -> subprocess.CompletedProcess:
+    """Runs a command without exiting if it fails.
+
+    Args:
+        cmd: Command to run. A list of arguments is executed directly, a string is run through the shell.
+        verbose: If True, logs the output of the command.
+    Returns:
+        The completed process. Its stdout is the decoded output if verbose is False (otherwise None), and its
+        stderr is the decoded tail of the error output, or the reason the program could not be started.
+    """
+    shell = isinstance(cmd, str)
+    stdout = None
+    stderr_tail: Deque[bytes] = collections.deque(maxlen=STDERR_TAIL_LINES)
+    try:
+        if verbose:
+            returncode = subprocess.run(cmd, shell=shell, check=False).returncode
+        else:
+            process = subprocess.Popen(
+                cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=PIPE_BUFFER_SIZE
+            )
+            assert process.stdout is not None and process.stderr is not None
+            # Drain stderr concurrently so neither pipe fills up, only keeping its tail for error reporting
+            stderr_thread = threading.Thread(target=stderr_tail.extend, args=(process.stderr,), daemon=True)
+            stderr_thread.start()
+            stdout = process.stdout.read()
+            returncode = process.wait()
+            stderr_thread.join()
+    except (FileNotFoundError, PermissionError) as e:
+        # Without a shell, a missing or non-executable program is raised here instead of failing in the shell
+        stderr_tail.append(f"{e}\n".encode("utf-8"))
+        returncode = 1
+    return subprocess.CompletedProcess(
+        cmd,
+        returncode,
+        stdout=stdout.decode("utf-8") if stdout is not None else None,
+        stderr=b"".join(stderr_tail).decode("utf-8", errors="replace"),
+    )
+
+
+def run_command(cmd: Union[str, List[str]], verbose=False) -> Optional[str]:
+    """Runs a command and returns the output. Exits if the command fails.
 
     Args:
-        cmd: Command to run.
+        cmd: Command to run. A list of arguments is executed directly, a string is run through the shell.
         verbose: If True, logs the output of the command.
     Returns:
-        The output of the command if return_output is True, otherwise None.
+        The output of the command if verbose is False, otherwise None.
     """
-    out = subprocess.run(cmd, capture_output=not verbose, shell=True, check=False)
+    out = try_run_command(cmd, verbose=verbose)
     if out.returncode != 0:
         CONSOLE.rule("[bold red] :skull: :skull: :skull: ERROR :skull: :skull: :skull: ", style="red")
-        CONSOLE.print(f"[bold red]Error running command: {cmd}")
+        CONSOLE.print(f"[bold red]Error running command: {cmd if isinstance(cmd, str) else shlex.join(cmd)}")
         CONSOLE.rule(style="red")
-        CONSOLE.print(out.stderr.decode("utf-8"))
+        CONSOLE.print(out.stderr)
         sys.exit(1)
-    if out.stdout is not None:
-        return out.stdout.decode("utf-8")
-    return out
+    return out.stdout
@@ -4,19 +4,37 @@ Test misc data utils
 
 import os
 import re
+import subprocess
 from pathlib import Path
+from typing import List
 from unittest import mock
 
 import cv2
 import numpy as np
+import pytest
 from PIL import Image
 from pyquaternion import Quaternion
 from scipy.spatial.transform import Rotation
 
 # TODO(1480) use pycolmap instead of colmap_parsing_utils
 # import pycolmap
-from nerfstudio.data.utils.colmap_parsing_utils import qvec2rotmat
-from nerfstudio.process_data.process_data_utils import convert_video_to_images
+from nerfstudio.data.utils.colmap_parsing_utils import (
+    Camera,
+    Image as ColmapImage,
+    Point3D,
+    qvec2rotmat,
+    qvecs2rotmats,
+    write_cameras_binary,
+    write_images_binary,
+    write_points3D_binary,
+)
+from nerfstudio.process_data.colmap_utils import create_sfm_depth, parse_colmap_camera_params
+from nerfstudio.process_data.process_data_utils import (
+    convert_video_to_images,
+    copy_images_list,
+    downscale_images,
+    get_num_frames_in_video,
+)
 
 
 def test_scalar_first_scalar_last_quaternions():
@@ -69,6 +87,8 @@ def test_scalar_first_scalar_last_quaternions():
     # R = pycolmap.qvec_to_rotmat(wxyz)
     R = qvec2rotmat(wxyz)
     assert np.allclose(R, R_expected)
+    R = qvecs2rotmats(wxyz[None])
+    assert np.allclose(R, R_expected[None])
 
 
 def test_process_video_conversion_with_seed(tmp_path: Path):
@@ -91,11 +111,11 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
             out.write(frame)
         out.release()
 
-    def extract_frame_numbers(ffmpeg_command: str):
+    def extract_frame_numbers(ffmpeg_command: List[str]):
         """Extracts the frame numbers from the ffmpeg command"""
 
         pattern = r"eq\(n\\,(\d+)\)"
-        matches = re.findall(pattern, ffmpeg_command)
+        matches = re.findall(pattern, " ".join(ffmpeg_command))
         frame_numbers = [int(match) for match in matches]
         return frame_numbers
 
@@ -129,8 +149,10 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
     (tmp_path / "mocked_bin" / "colmap").touch(mode=0o777)
     (tmp_path / "mocked_bin" / "ffmpeg").touch(mode=0o777)
 
-    # Return value of 10 for the get_num_frames_in_video run_command call
-    with mock.patch("nerfstudio.process_data.process_data_utils.run_command", return_value="10") as mock_run_func:
+    # Return value of 10 frames for the get_num_frames_in_video run_command call
+    with mock.patch(
+        "nerfstudio.process_data.process_data_utils.run_command", return_value='{"streams": [{"nb_frames": "10"}]}'
+    ) as mock_run_func:
         summary_log, extracted_frame_count = convert_video_to_images(
             video_path=video_path,
             image_dir=image_output_dir,
@@ -173,3 +195,213 @@ def test_process_video_conversion_with_seed(tmp_path: Path):
         third_frames = extract_frame_numbers(mock_run_func.call_args[0][0])
         assert len(third_frames) == 5, f"Expected 5 frames, but got {len(first_frames)}"
         assert first_frames != third_frames
+
+
+def test_get_num_frames_in_video_from_header():
+    """
+    Test that get_num_frames_in_video reads the frame count from the header, or estimates it from the duration.
+    """
+    with mock.patch(
+        "nerfstudio.process_data.process_data_utils.run_command", return_value='{"streams": [{"nb_frames": "42"}]}'
+    ) as mock_run_func:
+        assert get_num_frames_in_video(Path("video.mp4")) == 42
+        assert mock_run_func.call_count == 1
+
+    probe = '{"streams": [{"r_frame_rate": "30000/1001"}], "format": {"duration": "10.010000"}}'
+    with mock.patch("nerfstudio.process_data.process_data_utils.run_command", return_value=probe) as mock_run_func:
+        assert get_num_frames_in_video(Path("video.mkv")) == 300
+        assert mock_run_func.call_count == 1
+
+    # Variable frame rate video, r_frame_rate is the timebase-level rate
+    probe = '{"streams": [{"avg_frame_rate": "30/1", "r_frame_rate": "90000/1"}], "format": {"duration": "10.0"}}'
+    with mock.patch("nerfstudio.process_data.process_data_utils.run_command", return_value=probe) as mock_run_func:
+        assert get_num_frames_in_video(Path("video.webm")) == 300
+        assert mock_run_func.call_count == 1
+
+
+def test_convert_video_to_images_cuda_fallback(tmp_path: Path, capsys):
+    """
+    Test that convert_video_to_images decodes on the CPU when the CUDA ffmpeg command fails, showing why.
+    """
+    video_path = tmp_path / "video.mp4"
+    video_path.touch()
+    utils = "nerfstudio.process_data.process_data_utils"
+    with mock.patch(f"{utils}.get_num_frames_in_video", return_value=10), mock.patch(
+        f"{utils}.get_ffmpeg_hwaccels", return_value=frozenset({"cuda"})
+    ), mock.patch(f"{utils}.get_ffmpeg_filters", return_value=frozenset({"scale_cuda"})), mock.patch(
+        f"{utils}.get_video_pixel_format", return_value="yuv420p10le"
+    ), mock.patch(
+        f"{utils}.try_run_command",
+        return_value=subprocess.CompletedProcess([], 1, stdout="", stderr="Cannot load libnvcuvid.so.1\n"),
+    ) as mock_cuda_run, mock.patch(f"{utils}.run_command") as mock_run_func:
+        convert_video_to_images(video_path, tmp_path / "images", num_frames_target=5, num_downscales=1, gpu=True)
+
+    cuda_cmd = " ".join(mock_cuda_run.call_args[0][0])
+    assert "-hwaccel cuda" in cuda_cmd and "hwdownload,format=p010le" in cuda_cmd
+    cpu_cmd = " ".join(mock_run_func.call_args[0][0])
+    assert "cuda" not in cpu_cmd
+    assert "Cannot load libnvcuvid.so.1" in capsys.readouterr().out
+
+
+def test_downscale_images(tmp_path: Path):
+    """
+    Test that downscale_images writes every downscale level with the expected resolution.
+    """
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    Image.fromarray(np.random.randint(0, 255, (101, 203, 3), dtype=np.uint8)).save(image_dir / "frame_00001.png")
+
+    downscale_images(image_dir, num_downscales=2, show_status=False)
+
+    with Image.open(tmp_path / "images_2" / "frame_00001.png") as image:
+        assert image.size == (101, 50)
+    with Image.open(tmp_path / "images_4" / "frame_00001.png") as image:
+        assert image.size == (50, 25)
+
+
+def test_downscale_images_webp_lossless(tmp_path: Path):
+    """
+    Test that downscale_images keeps WebP images lossless.
+    """
+    image_dir = tmp_path / "images"
+    image_dir.mkdir()
+    image = Image.fromarray(np.random.randint(0, 255, (64, 96, 3), dtype=np.uint8))
+    image.save(image_dir / "frame_00001.webp", lossless=True)
+
+    downscale_images(image_dir, num_downscales=1, show_status=False)
+
+    with Image.open(tmp_path / "images_2" / "frame_00001.webp") as downscaled:
+        expected = image.resize((48, 32), resample=Image.Resampling.BOX)
+        assert np.array_equal(np.asarray(downscaled.convert("RGB")), np.asarray(expected))
+
+
+def test_copy_images_list_webp_lossless(tmp_path: Path):
+    """
+    Test that copy_images_list re-encodes WebP images losslessly rather than with JPEG quality options.
+    """
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    for i in range(2):
+        (input_dir / f"image_{i}.webp").touch()
+
+    with mock.patch("nerfstudio.process_data.process_data_utils.run_command") as mock_run_func:
+        copy_images_list(sorted(input_dir.iterdir()), tmp_path / "images", num_downscales=1)
+
+    ffmpeg_cmd = mock_run_func.call_args[0][0]
+    assert ffmpeg_cmd[-10:] == [
+        "-map",
+        "[out0]",
+        "-lossless",
+        "1",
+        str(tmp_path / "images" / "frame_%05d.webp"),
+        "-map",
+        "[out1]",
+        "-lossless",
+        "1",
+        str(tmp_path / "images_2" / "frame_%05d.webp"),
+    ]
+    assert "-q:v" not in ffmpeg_cmd
+
+
+@pytest.mark.parametrize(
+    "model, num_params, expected",
+    [
+        (
+            "SIMPLE_PINHOLE",
+            3,
+            {"fl_x": 1.0, "fl_y": 1.0, "cx": 2.0, "cy": 3.0, "k1": 0.0, "k2": 0.0, "p1": 0.0, "p2": 0.0},
+        ),
+        (
+            "PINHOLE",
+            4,
+            {"fl_x": 1.0, "fl_y": 2.0, "cx": 3.0, "cy": 4.0, "k1": 0.0, "k2": 0.0, "p1": 0.0, "p2": 0.0},
+        ),
+        (
+            "SIMPLE_RADIAL",
+            4,
+            {"fl_x": 1.0, "fl_y": 1.0, "cx": 2.0, "cy": 3.0, "k1": 4.0, "k2": 0.0, "p1": 0.0, "p2": 0.0},
+        ),
+        (
+            "RADIAL",
+            5,
+            {"fl_x": 1.0, "fl_y": 1.0, "cx": 2.0, "cy": 3.0, "k1": 4.0, "k2": 5.0, "p1": 0.0, "p2": 0.0},
+        ),
+        (
+            "OPENCV",
+            8,
+            {"fl_x": 1.0, "fl_y": 2.0, "cx": 3.0, "cy": 4.0, "k1": 5.0, "k2": 6.0, "p1": 7.0, "p2": 8.0},
+        ),
+        (
+            "OPENCV_FISHEYE",
+            8,
+            {"fl_x": 1.0, "fl_y": 2.0, "cx": 3.0, "cy": 4.0, "k1": 5.0, "k2": 6.0, "k3": 7.0, "k4": 8.0},
+        ),
+        (
+            "SIMPLE_RADIAL_FISHEYE",
+            4,
+            {"fl_x": 1.0, "fl_y": 1.0, "cx": 2.0, "cy": 3.0, "k1": 4.0, "k2": 0.0, "k3": 0.0, "k4": 0.0},
+        ),
+        (
+            "RADIAL_FISHEYE",
+            5,
+            {"fl_x": 1.0, "fl_y": 1.0, "cx": 2.0, "cy": 3.0, "k1": 4.0, "k2": 5.0, "k3": 0.0, "k4": 0.0},
+        ),
+    ],
+)
+def test_parse_colmap_camera_params(model: str, num_params: int, expected: dict):
+    """
+    Test that parse_colmap_camera_params reads each supported COLMAP camera model's parameters.
+    """
+    camera_model = "OPENCV_FISHEYE" if "FISHEYE" in model else "OPENCV"
+    camera = Camera(id=1, model=model, width=640, height=480, params=np.arange(1, num_params + 1, dtype=np.float64))
+
+    out = parse_colmap_camera_params(camera)
+
+    assert out == {"w": 640, "h": 480, **expected, "camera_model": camera_model}
+
+
+@pytest.mark.parametrize("model, num_params", [("FULL_OPENCV", 12), ("FOV", 5), ("THIN_PRISM_FISHEYE", 12)])
+def test_parse_colmap_camera_params_unsupported(model: str, num_params: int):
+    """
+    Test that parse_colmap_camera_params rejects the COLMAP camera models nerfstudio does not support.
+    """
+    camera = Camera(id=1, model=model, width=640, height=480, params=np.arange(1, num_params + 1, dtype=np.float64))
+
+    with pytest.raises(NotImplementedError, match=f"{model} camera model is not supported yet!"):
+        parse_colmap_camera_params(camera)
+
+
+def test_create_sfm_depth_webp_images(tmp_path: Path):
+    """
+    Test that create_sfm_depth writes 16-bit PNG depth maps for WebP images, which can't hold 16-bit depth.
+    """
+    sparse_path = tmp_path / "sparse" / "0"
+    sparse_path.mkdir(parents=True)
+    write_cameras_binary({1: Camera(1, "PINHOLE", 64, 48, [50, 50, 32, 24])}, sparse_path / "cameras.bin")
+    write_points3D_binary(
+        {
+            1: Point3D(
+                id=1,
+                xyz=np.array([0, 0, 2.5]),
+                rgb=np.array([0, 0, 0]),
+                error=np.array(0.5),
+                image_ids=np.array([1, 2]),
+                point2D_idxs=np.array([0, 0]),
+            ),
+        },
+        sparse_path / "points3D.bin",
+    )
+    identity = np.array([1.0, 0.0, 0.0, 0.0])
+    frames = {
+        i: ColmapImage(i, identity, np.zeros(3), 1, f"frame_{i:05d}.webp", np.array([[10.0, 20.0]]), np.array([1]))
+        for i in (1, 2)
+    }
+    write_images_binary(frames, sparse_path / "images.bin")
+    (tmp_path / "depths").mkdir()
+
+    image_id_to_depth_path = create_sfm_depth(sparse_path, tmp_path / "depths", verbose=False)
+
+    assert image_id_to_depth_path[1] == tmp_path / "depths" / "frame_00001.png"
+    depth = cv2.imread(str(image_id_to_depth_path[1]), cv2.IMREAD_UNCHANGED)
+    assert depth.dtype == np.uint16
+    assert depth[20, 10] == 2500
@@ -2,10 +2,12 @@
 Process images test
 """
 
+import json
 import os
 from pathlib import Path
 
 import numpy as np
+import pytest
 import torch
 from PIL import Image
 
@@ -39,10 +41,15 @@ def random_quaternion(num_poses: int):
     return quaternion
 
 
-def test_process_images_skip_colmap(tmp_path: Path):
+@pytest.mark.parametrize(
+    "camera",
+    [("OPENCV", [110, 110, 50, 75, 0, 0, 0, 0, 0, 0]), ("OPENCV_FISHEYE", [110, 110, 50, 75, 0.1, 0.2, 0.3, 0.4])],
+)
+def test_process_images_skip_colmap(tmp_path: Path, camera):
     """
     Test ns-process-data images
     """
+    camera_model, camera_params = camera
     # Mock a colmap sparse model
     width = 100
     height = 150
@@ -50,7 +57,7 @@ def test_process_images_skip_colmap(tmp_path: Path):
     sparse_path.mkdir(exist_ok=True, parents=True)
     (tmp_path / "images").mkdir(exist_ok=True, parents=True)
     write_cameras_binary(
-        {1: Camera(1, "OPENCV", width, height, [110, 110, 50, 75, 0, 0, 0, 0, 0, 0])},
+        {1: Camera(1, camera_model, width, height, camera_params)},
         sparse_path / "cameras.bin",
     )
     write_points3D_binary(
@@ -92,8 +99,9 @@ def test_process_images_skip_colmap(tmp_path: Path):
     old_path = os.environ.get("PATH", "")
     os.environ["PATH"] = str(tmp_path / "mocked_bin") + f":{old_path}"
     (tmp_path / "mocked_bin").mkdir()
-    (tmp_path / "mocked_bin" / "colmap").touch(mode=0o777)
-    (tmp_path / "mocked_bin" / "ffmpeg").touch(mode=0o777)
+    for mocked_bin in ("colmap", "ffmpeg"):
+        (tmp_path / "mocked_bin" / mocked_bin).write_text("#!/bin/sh\n")
+        (tmp_path / "mocked_bin" / mocked_bin).chmod(0o777)
 
     # Convert images into a NerfStudio dataset
     cmd = ImagesToNerfstudioDataset(
@@ -103,6 +111,20 @@ def test_process_images_skip_colmap(tmp_path: Path):
     os.environ["PATH"] = old_path
 
     assert (tmp_path / "nerfstudio" / "transforms.json").exists()
+    transforms = json.loads((tmp_path / "nerfstudio" / "transforms.json").read_text())
+    # The exported poses keep full precision, so their rotations are orthonormal well beyond float32 accuracy
+    rotations = np.array([frame["transform_matrix"] for frame in transforms["frames"]])[:, :3, :3]
+    np.testing.assert_allclose(
+        rotations @ rotations.transpose(0, 2, 1), np.eye(3)[None].repeat(num_frames, 0), atol=1e-12
+    )
+    with np.load(tmp_path / "nerfstudio" / "poses.npz") as poses:
+        assert poses["names"].tolist() == [frame["file_path"] for frame in transforms["frames"]]
+        np.testing.assert_allclose(
+            poses["c2w"], [frame["transform_matrix"] for frame in transforms["frames"]], rtol=1e-6
+        )
+        assert poses["camera_model"] == transforms["camera_model"]
+        np.testing.assert_allclose(poses["intrinsics"], [transforms[k] for k in poses["intrinsics_keys"]])
+        np.testing.assert_allclose(poses["intrinsics"][4:], camera_params[4:8], rtol=1e-6)
     parser = NerfstudioDataParserConfig(
         data=tmp_path / "nerfstudio",
         downscale_factor=None,
@@ -180,8 +202,9 @@ def test_process_images_recursively_skip_colmap(tmp_path: Path):
     old_path = os.environ.get("PATH", "")
     os.environ["PATH"] = str(tmp_path / "mocked_bin") + f":{old_path}"
     (tmp_path / "mocked_bin").mkdir()
-    (tmp_path / "mocked_bin" / "colmap").touch(mode=0o777)
-    (tmp_path / "mocked_bin" / "ffmpeg").touch(mode=0o777)
+    for mocked_bin in ("colmap", "ffmpeg"):
+        (tmp_path / "mocked_bin" / mocked_bin).write_text("#!/bin/sh\n")
+        (tmp_path / "mocked_bin" / mocked_bin).chmod(0o777)
 
     # Convert images into a NerfStudio dataset
     cmd = ImagesToNerfstudioDataset(
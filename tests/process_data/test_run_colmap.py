@@ -0,0 +1,164 @@
+"""
+Test the COLMAP commands issued by run_colmap
+"""
+
+from pathlib import Path
+from typing import List, Optional
+from unittest import mock
+
+import pytest
+from packaging.version import Version
+
+from nerfstudio.process_data import colmap_utils
+from nerfstudio.process_data.process_data_utils import CameraModel
+
+
+def run_mocked_colmap(
+    tmp_path: Path,
+    num_images: int = 10,
+    fail_on: Optional[str] = None,
+    shared_memory_dir: Optional[Path] = None,
+    **kwargs,
+) -> List[List[str]]:
+    """Runs run_colmap with mocked COLMAP commands, returning the commands that were run."""
+    commands = []
+    if shared_memory_dir is None:
+        shared_memory_dir = tmp_path / "shm"
+
+    def mock_run_command(cmd: List[str], verbose: bool = False) -> None:
+        commands.append(cmd)
+        if "--database_path" in cmd:
+            Path(cmd[cmd.index("--database_path") + 1]).touch()
+        if cmd[1] == fail_on:
+            raise SystemExit(1)
+
+    (tmp_path / "colmap").mkdir(parents=True, exist_ok=True)
+    shared_memory_dir.mkdir(parents=True, exist_ok=True)
+    with mock.patch.object(colmap_utils, "run_command", mock_run_command), mock.patch.object(
+        colmap_utils, "get_colmap_version", return_value=Version("3.8")
+    ), mock.patch.object(colmap_utils, "get_colmap_argv", return_value=["colmap"]), mock.patch.object(
+        colmap_utils, "list_images", return_value=[Path(f"image_{i}.jpg") for i in range(num_images)]
+    ), mock.patch.object(colmap_utils, "SHARED_MEMORY_DIR", shared_memory_dir), mock.patch(
+        "os.statvfs", return_value=mock.Mock(f_bavail=1 << 40, f_frsize=4096)
+    ):
+        colmap_utils.run_colmap(
+            tmp_path / "images", tmp_path / "colmap", CameraModel.OPENCV, refine_intrinsics=False, **kwargs
+        )
+    return commands
+
+
+def get_command(commands: List[List[str]], subcommand: str) -> List[str]:
+    """Returns the command running the given COLMAP subcommand."""
+    return next(cmd for cmd in commands if cmd[1] == subcommand)
+
+
+def test_run_colmap_database_in_shared_memory(tmp_path: Path):
+    """
+    Test that the database is kept in shared memory while COLMAP runs and moved to the COLMAP directory afterwards.
+    """
+    commands = run_mocked_colmap(tmp_path, matching_method="exhaustive")
+
+    assert [cmd[1] for cmd in commands] == ["feature_extractor", "exhaustive_matcher", "mapper"]
+    for cmd in commands:
+        database_path = Path(cmd[cmd.index("--database_path") + 1])
+        assert database_path.parent.parent == tmp_path / "shm"
+    assert (tmp_path / "colmap" / "database.db").exists()
+    assert list((tmp_path / "shm").iterdir()) == []
+
+
+def test_run_colmap_database_unique_per_run(tmp_path: Path):
+    """
+    Test that runs sharing one shared-memory directory, e.g. containers sharing /dev/shm, neither share nor remove
+    each other's database.
+    """
+    other_run_dir = tmp_path / "shm" / "colmap_other"
+    other_run_dir.mkdir(parents=True)
+    (other_run_dir / "database.db").touch()
+    (other_run_dir / "database.db-journal").touch()
+
+    first_commands = run_mocked_colmap(
+        tmp_path / "first", matching_method="exhaustive", shared_memory_dir=tmp_path / "shm"
+    )
+    second_commands = run_mocked_colmap(
+        tmp_path / "second", matching_method="exhaustive", shared_memory_dir=tmp_path / "shm"
+    )
+
+    first_extractor_cmd = get_command(first_commands, "feature_extractor")
+    second_extractor_cmd = get_command(second_commands, "feature_extractor")
+    first_database = first_extractor_cmd[first_extractor_cmd.index("--database_path") + 1]
+    second_database = second_extractor_cmd[second_extractor_cmd.index("--database_path") + 1]
+    assert first_database != second_database
+    assert (tmp_path / "first" / "colmap" / "database.db").exists()
+    assert (tmp_path / "second" / "colmap" / "database.db").exists()
+    assert sorted(path.name for path in other_run_dir.iterdir()) == ["database.db", "database.db-journal"]
+    assert list((tmp_path / "shm").iterdir()) == [other_run_dir]
+
+
+def test_run_colmap_database_shared_memory_unusable(tmp_path: Path):
+    """
+    Test that the database is kept in the COLMAP directory when shared memory can't be written to.
+    """
+    with mock.patch("tempfile.mkdtemp", side_effect=PermissionError(13, "Permission denied")):
+        commands = run_mocked_colmap(tmp_path, matching_method="exhaustive")
+
+    for cmd in commands:
+        assert cmd[cmd.index("--database_path") + 1] == str(tmp_path / "colmap" / "database.db")
+    assert (tmp_path / "colmap" / "database.db").exists()
+
+
+@pytest.mark.parametrize("fail_on", ["feature_extractor", "exhaustive_matcher", "mapper"])
+def test_run_colmap_database_moved_on_failure(tmp_path: Path, fail_on: str):
+    """
+    Test that the database is moved out of shared memory when a COLMAP step fails.
+    """
+    with pytest.raises(SystemExit):
+        run_mocked_colmap(tmp_path, fail_on=fail_on, matching_method="exhaustive")
+
+    assert (tmp_path / "colmap" / "database.db").exists()
+    assert list((tmp_path / "shm").iterdir()) == []
+
+
+def test_run_colmap_matcher_commands(tmp_path: Path):
+    """
+    Test the feature matcher options for loop detection and the switch to the vocab tree matcher.
+    """
+    vocab_tree_path = tmp_path / "vocab_tree.bin"
+
+    commands = run_mocked_colmap(tmp_path, matching_method="sequential", vocab_tree_path=vocab_tree_path)
+    matcher_cmd = get_command(commands, "sequential_matcher")
+    assert matcher_cmd[matcher_cmd.index("--SequentialMatching.loop_detection") + 1] == "1"
+    assert matcher_cmd[matcher_cmd.index("--SequentialMatching.vocab_tree_path") + 1] == str(vocab_tree_path)
+
+    commands = run_mocked_colmap(
+        tmp_path, num_images=500, matching_method="exhaustive", vocab_tree_path=vocab_tree_path
+    )
+    assert get_command(commands, "exhaustive_matcher")
+
+    commands = run_mocked_colmap(
+        tmp_path, num_images=501, matching_method="exhaustive", vocab_tree_path=vocab_tree_path
+    )
+    matcher_cmd = get_command(commands, "vocab_tree_matcher")
+    assert matcher_cmd[matcher_cmd.index("--VocabTreeMatching.vocab_tree_path") + 1] == str(vocab_tree_path)
+
+
+def test_run_colmap_mapper_commands(tmp_path: Path):
+    """
+    Test the mapper selection by image count, the opt-out of the hierarchical mapper and the fast mapper options.
+    """
+    commands = run_mocked_colmap(tmp_path, num_images=499, matching_method="exhaustive")
+    mapper_cmd = get_command(commands, "mapper")
+    assert "--Mapper.ba_global_function_tolerance=1e-6" in mapper_cmd
+    assert "--Mapper.ba_global_max_refinements" not in mapper_cmd
+
+    commands = run_mocked_colmap(tmp_path, num_images=500, matching_method="exhaustive")
+    mapper_cmd = get_command(commands, "hierarchical_mapper")
+    assert "--num_workers" in mapper_cmd
+    assert "--Mapper.ba_global_function_tolerance=1e-6" in mapper_cmd
+
+    commands = run_mocked_colmap(tmp_path, num_images=500, matching_method="exhaustive", use_hierarchical_mapper=False)
+    assert get_command(commands, "mapper")
+
+    commands = run_mocked_colmap(tmp_path, matching_method="exhaustive", fast_mapper=True)
+    mapper_cmd = get_command(commands, "mapper")
+    for option, value in colmap_utils.FAST_MAPPER_OPTIONS.items():
+        assert mapper_cmd[mapper_cmd.index(f"--{option}") + 1] == str(value)
@@ -0,0 +1,36 @@
+"""
+Test the run_command helper
+"""
+
+import sys
+
+import pytest
+
+from nerfstudio.utils.scripts import run_command
+
+
+def test_run_command_returns_stdout():
+    """Test that an argument list runs without a shell and returns its output."""
+    assert run_command([sys.executable, "-c", "print('hello world')"]) == "hello world\n"
+
+
+def test_run_command_failure_prints_stderr_tail(capsys):
+    """Test that a failing command exits, printing the tail of a large error output."""
+    script = (
+        "import sys; [print(f'line {i}', file=sys.stderr) for i in range(100000)]; print('x' * 1000000); sys.exit(3)"
+    )
+    with pytest.raises(SystemExit) as exit_info:
+        run_command([sys.executable, "-c", script])
+    assert exit_info.value.code == 1
+    output = capsys.readouterr().out
+    assert "Error running command" in output
+    assert "line 99999" in output
+    assert "line 0\n" not in output
+
+
+def test_run_command_missing_executable(capsys):
+    """Test that a missing program exits with an error message instead of raising."""
+    with pytest.raises(SystemExit) as exit_info:
+        run_command(["nerfstudio-missing-executable", "--help"])
+    assert exit_info.value.code == 1
+    assert "nerfstudio-missing-executable" in capsys.readouterr().out